@@ -0,0 +1,133 @@
+import io
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from secret_hunter.rules import compile_rules
+from secret_hunter.scanner import scan_lines
+
+ARCHIVE_EXTENSIONS = (
+    ".zip", ".jar", ".apk", ".aar", ".war", ".ear", ".whl", ".nupkg",
+    ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz",
+)
+DEFAULT_ARCHIVE_DEPTH = 3
+# Nested archives up to this size are buffered in memory, larger ones in a temporary file.
+SPOOL_SIZE = 16 * 1024 * 1024
+MEMBER_SEPARATOR = "!/"
+
+
+def is_archive(path):
+    """Returns True if the path has the extension of a supported archive."""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _iter_zip_members(zipf):
+    with zipf:
+        for info in zipf.infolist():
+            if not info.is_dir():
+                with zipf.open(info) as stream:
+                    yield info.filename, info.file_size, stream
+
+
+def _iter_tar_members(tar):
+    with tar:
+        for member in tar:
+            if member.isfile():
+                yield member.name, member.size, tar.extractfile(member)
+
+
+def open_archive(fileobj):
+    """
+    Returns an iterator of (name, size, stream) for every regular file in a
+    zip or tar archive, or None if the file object is neither. Members are
+    read as streams and never extracted.
+    """
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        return _iter_zip_members(zipfile.ZipFile(fileobj))
+    fileobj.seek(0)
+    try:
+        return _iter_tar_members(tarfile.open(fileobj=fileobj, mode="r:*"))
+    except tarfile.TarError:
+        return None
+
+
+def _spool(stream, size):
+    """Copies a member stream into a seekable file object so it can be opened as an archive."""
+    if size <= SPOOL_SIZE:
+        return io.BytesIO(stream.read())
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(stream, spool)
+    return spool
+
+
+def _scan_lines_of(fileobj, display_path, rules):
+    return scan_lines(io.TextIOWrapper(fileobj, encoding="utf-8", errors="ignore"), display_path, rules)
+
+
+def _scan_stream(stream, size, display_path, rules, depth, max_depth):
+    """Scans one archive member, recursing into it if it is itself an archive."""
+    if depth < max_depth and is_archive(display_path):
+        with _spool(stream, size) as spool:
+            findings = _scan_archive_fileobj(spool, display_path, rules, depth + 1, max_depth)
+            if findings is not None:
+                return findings
+            spool.seek(0)
+            return _scan_lines_of(spool, display_path, rules)
+    return _scan_lines_of(stream, display_path, rules)
+
+
+def _scan_archive_fileobj(fileobj, display_path, rules, depth, max_depth):
+    """
+    Scans every member of an archive, or returns None if the file is not an
+    archive. Members that fail to scan are logged and skipped, and if the
+    archive itself is cut short, the findings of the members read so far are
+    kept.
+    """
+    members = open_archive(fileobj)
+    if members is None:
+        return None
+    findings = []
+    try:
+        for name, size, stream in members:
+            member_path = f"{display_path}{MEMBER_SEPARATOR}{name}"
+            # A corrupt member, such as a truncated nested archive, is skipped
+            # without discarding what the other members found.
+            try:
+                findings.extend(_scan_stream(stream, size, member_path, rules, depth, max_depth))
+            except Exception as e:
+                print(f"Error scanning archive member {member_path}: {e}")
+    except Exception as e:
+        print(f"Error reading archive {display_path}: {e}")
+    return findings
+
+
+def scan_archive(archive_path, rules, max_depth=DEFAULT_ARCHIVE_DEPTH):
+    """
+    Scans the members of a zip or tar archive as streams, without extracting
+    them to disk. Nested archives (jar, apk, whl, nupkg, ...) are scanned up
+    to max_depth levels deep. Each finding's file is the member path, such as
+    "outer.zip!/lib/a.jar!/Config.class". Files that turn out not to be
+    archives are scanned as plain files.
+    """
+    rules = compile_rules(rules)
+    try:
+        with open(archive_path, "rb") as f:
+            findings = _scan_archive_fileobj(f, archive_path, rules, 1, max_depth)
+            if findings is not None:
+                return findings
+            f.seek(0)
+            return _scan_lines_of(f, archive_path, rules)
+    except Exception as e:
+        print(f"Error scanning archive {archive_path}: {e}")
+    return []
+
+
+def find_license_in_archive(archive_path, names=("LICENSE", "LICENSE.md", "COPYING")):
+    """Reads the license file at the root of an archive or of its single top-level directory."""
+    with open(archive_path, "rb") as f:
+        for name, _, stream in open_archive(f) or ():
+            parts = name.strip("/").split("/")
+            if len(parts) <= 2 and parts[-1] in names:
+                return stream.read().decode("utf-8", errors="ignore")
+    return None
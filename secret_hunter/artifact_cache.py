@@ -0,0 +1,155 @@
+import os
+import json
+import shutil
+import hashlib
+from urllib.parse import urlparse
+
+DEFAULT_MAX_CACHE_SIZE_MB = 2048
+ENTRY_FILE = "entry.json"
+EXTRACTED_DIR = "extracted"
+# Written only once an extraction has finished, so a half-extracted directory is never reused.
+EXTRACTED_MARKER = ".extracted"
+
+
+def url_key(url):
+    """Returns the SHA-256 of a URL, used to name its index entry and partial download."""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _tree_size(path):
+    """Returns the total size of the files below a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class ArtifactCache:
+    """
+    A content-addressed cache of downloaded archives and their extractions.
+
+    Each archive is stored once under objects/<sha256>/, whatever URL it came
+    from, next to its extracted tree and an entry.json recording its name and
+    size. urls/<sha256 of url> maps a URL to the content it last served, and
+    downloads/<sha256 of url>/ holds partial downloads so they can resume.
+    The mtime of entry.json records when an object was last used, and the
+    least recently used objects are evicted to keep the cache under max_size.
+    """
+
+    def __init__(self, cache_dir, max_size_mb=DEFAULT_MAX_CACHE_SIZE_MB):
+        self.root = os.path.join(cache_dir, "artifacts")
+        self.max_size = max_size_mb * 1024 * 1024
+        for name in ("objects", "urls", "downloads"):
+            os.makedirs(os.path.join(self.root, name), exist_ok=True)
+
+    def _object_dir(self, digest):
+        return os.path.join(self.root, "objects", digest.lower())
+
+    def _url_index(self, url):
+        return os.path.join(self.root, "urls", url_key(url))
+
+    def _read_entry(self, digest):
+        try:
+            with open(os.path.join(self._object_dir(digest), ENTRY_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, digest, entry):
+        path = os.path.join(self._object_dir(digest), ENTRY_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(entry, f)
+        os.replace(path + ".tmp", path)
+
+    def _index_url(self, url, digest):
+        with open(self._url_index(url), "w") as f:
+            f.write(digest.lower())
+
+    def archive_path(self, digest):
+        """Returns the path of a cached archive."""
+        return os.path.join(self._object_dir(digest), self._read_entry(digest)["name"])
+
+    def lookup(self, url, expected_checksum=None):
+        """
+        Returns the digest of the cached content for a URL, or None on a miss.
+        With an expected checksum any URL that served that content is a hit;
+        without one, the content the URL served last time is reused.
+        """
+        digest = expected_checksum
+        if not digest:
+            try:
+                with open(self._url_index(url), "r") as f:
+                    digest = f.read().strip()
+            except OSError:
+                return None
+        if self._read_entry(digest) is None:
+            return None
+        self._index_url(url, digest)
+        os.utime(os.path.join(self._object_dir(digest), ENTRY_FILE))
+        return digest.lower()
+
+    def download_path(self, url):
+        """Returns where a URL is downloaded to before being stored, named after the URL's file."""
+        directory = os.path.join(self.root, "downloads", url_key(url))
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, os.path.basename(urlparse(url).path) or "archive")
+
+    def store(self, url, digest, downloaded_path):
+        """Moves a finished download into the cache under its content digest and returns the digest."""
+        object_dir = self._object_dir(digest)
+        os.makedirs(object_dir, exist_ok=True)
+        name = os.path.basename(downloaded_path)
+        os.replace(downloaded_path, os.path.join(object_dir, name))
+        shutil.rmtree(os.path.dirname(downloaded_path), ignore_errors=True)
+        self._write_entry(digest, {"name": name, "size": os.path.getsize(os.path.join(object_dir, name))})
+        self._index_url(url, digest)
+        return digest.lower()
+
+    def extract(self, digest, extract):
+        """
+        Returns the extracted tree of a cached archive, calling
+        extract(archive_path, extract_dir) only if no completed extraction exists.
+        """
+        object_dir = self._object_dir(digest)
+        extract_dir = os.path.join(object_dir, EXTRACTED_DIR)
+        marker = os.path.join(object_dir, EXTRACTED_MARKER)
+        if os.path.exists(marker):
+            return extract_dir
+
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        extract(self.archive_path(digest), extract_dir)
+        entry = self._read_entry(digest)
+        entry["size"] += _tree_size(extract_dir)
+        self._write_entry(digest, entry)
+        open(marker, "w").close()
+        return extract_dir
+
+    def evict(self, keep=()):
+        """
+        Removes the least recently used objects until the cache fits in
+        max_size. Objects whose digest is in keep are never removed. Only the
+        small entry files are read, so this costs no scan of the cached trees.
+        """
+        objects_dir = os.path.join(self.root, "objects")
+        keep = {digest.lower() for digest in keep}
+        entries = []
+        total = 0
+        for digest in os.listdir(objects_dir):
+            entry = self._read_entry(digest)
+            if entry is None:
+                continue
+            last_used = os.path.getmtime(os.path.join(objects_dir, digest, ENTRY_FILE))
+            entries.append((last_used, digest, entry["size"]))
+            total += entry["size"]
+
+        evicted = []
+        for _, digest, size in sorted(entries):
+            if total <= self.max_size:
+                break
+            if digest in keep:
+                continue
+            shutil.rmtree(os.path.join(objects_dir, digest), ignore_errors=True)
+            total -= size
+            evicted.append(digest)
+        return evicted
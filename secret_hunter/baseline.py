@@ -0,0 +1,154 @@
+import os
+from secret_hunter.findings import secret_hash
+from secret_hunter.remediation import read_report
+from secret_hunter.triage import ExcludeMatcher
+
+# Extensions of whitelist files; anything else is read as a previous report.
+WHITELIST_EXTENSIONS = (".yml", ".yaml")
+
+
+class Allowlist:
+    """
+    An index of accepted findings, each identified by rule id, secret hash and
+    path. Exact fingerprints, as taken from a previous report, live in a set,
+    so checking a match costs one hash lookup. Entries with a path glob or
+    without a rule id or secret hash are grouped by (rule id, secret hash),
+    with the globs of a group combined into one regex, so a match costs at
+    most four more lookups whatever the size of the list.
+
+    Paths are compared relative to the scan root, with "/" separators, and
+    globs use .gitignore syntax. A finding under another root, such as an
+    absolute path, is compared as given.
+    """
+
+    def __init__(self, root=None):
+        self.prefixes = ()
+        if root is not None:
+            if os.path.isfile(root):
+                root = os.path.dirname(root)
+            if root:
+                self.prefixes = tuple({os.path.join(root, ""), os.path.join(os.path.abspath(root), "")})
+        self.fingerprints = set()
+        self.globs = {}
+        self.matchers = None
+
+    def __len__(self):
+        return len(self.fingerprints) + sum(len(globs) for globs in self.globs.values())
+
+    def relative(self, path):
+        """Returns the path relative to the scan root, as it is stored in the index."""
+        for prefix in self.prefixes:
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+                break
+        return path.replace(os.sep, "/")
+
+    def add(self, rule_id, secret, path):
+        """Accepts the finding of a rule with this secret hash at exactly this path."""
+        self.fingerprints.add((rule_id, secret, self.relative(path)))
+
+    def add_glob(self, rule_id=None, secret=None, glob="**"):
+        """Accepts findings matching a glob; a missing rule id or secret hash matches any."""
+        self.globs.setdefault((rule_id, secret), []).append(glob)
+        self.matchers = None
+
+    def update(self, other):
+        """Adds the entries of another Allowlist built for the same root."""
+        self.fingerprints |= other.fingerprints
+        for key, globs in other.globs.items():
+            self.globs.setdefault(key, []).extend(globs)
+        self.matchers = None
+        return self
+
+    def suppresses(self, rule_id, secret, path):
+        """Returns True if the match of the rule with this secret hash in the file is accepted."""
+        path = self.relative(path)
+        if (rule_id, secret, path) in self.fingerprints:
+            return True
+        if self.matchers is None:
+            # Compiled on first use, once every entry has been added.
+            self.matchers = {key: ExcludeMatcher(globs) for key, globs in self.globs.items()}
+        if self.matchers:
+            for key in ((rule_id, secret), (rule_id, None), (None, secret), (None, None)):
+                matcher = self.matchers.get(key)
+                if matcher is not None and matcher.match(path):
+                    return True
+        return False
+
+    def contains(self, finding):
+        return self.suppresses(finding["id"], finding.get("secret_hash"), finding["file"])
+
+    def mark(self, findings):
+        """Yields the findings, with "baseline": true added to the accepted ones."""
+        for finding in findings:
+            yield dict(finding, baseline=True) if self.contains(finding) else finding
+
+    def filter(self, findings, stats=None):
+        """Yields the findings that are not accepted, counting the others in a ScanStats if given."""
+        for finding in findings:
+            if self.contains(finding):
+                if stats is not None:
+                    stats.findings_suppressed += 1
+            else:
+                yield finding
+
+
+def _entry_problems(entry):
+    """Returns the reasons a whitelist entry cannot be used, or an empty list if it is valid."""
+    if not isinstance(entry, dict):
+        return ["not a mapping"]
+    problems = [f"unknown key '{key}'" for key in entry if key not in ("id", "secret", "secret_hash", "path")]
+    if "secret" in entry and "secret_hash" in entry:
+        problems.append("needs at most one of 'secret' and 'secret_hash'")
+    if not any(key in entry for key in ("id", "secret", "secret_hash", "path")):
+        problems.append("needs at least one of 'id', 'secret', 'secret_hash' and 'path'")
+    return problems
+
+
+def read_whitelist(whitelist_file, root=None):
+    """
+    Reads a YAML whitelist into an Allowlist. Each entry accepts the findings
+    matching all of its keys: a rule id, a secret (stored only as its hash)
+    or secret_hash, and a path glob relative to the scan root. A secret is
+    hashed like the secret of a finding, so `secret: abc` accepts a match of
+    `api_key = "abc"` whose rule captures the key.
+    """
+    # Imported here, like in load_rules, so that scans without a whitelist never load yaml.
+    import yaml
+    with open(whitelist_file, "r") as f:
+        entries = (yaml.safe_load(f) or {}).get("whitelist") or []
+    allowlist = Allowlist(root)
+    for position, entry in enumerate(entries, 1):
+        problems = _entry_problems(entry)
+        if problems:
+            print(f"Error in whitelist entry #{position}, skipping it: {'; '.join(problems)}")
+            continue
+        secret = secret_hash(str(entry["secret"])) if "secret" in entry else entry.get("secret_hash")
+        allowlist.add_glob(entry.get("id"), secret, entry.get("path", "**"))
+    return allowlist
+
+
+def read_baseline(report_file, root=None):
+    """
+    Reads the findings of a previous report into an Allowlist of exact
+    fingerprints. Findings written before reports carried secret hashes
+    cannot be told apart from new secrets in the same file, so they are left
+    out with a warning.
+    """
+    allowlist = Allowlist(root)
+    skipped = 0
+    for finding in read_report(report_file)[0]:
+        if not finding.get("secret_hash"):
+            skipped += 1
+            continue
+        allowlist.add(finding["id"], finding["secret_hash"], finding["file"])
+    if skipped:
+        print(f"Warning: {skipped} findings of {report_file} have no secret_hash and are not part of the baseline.")
+    return allowlist
+
+
+def load_whitelist(whitelist_file, root=None):
+    """Reads a YAML whitelist, or a previous report whose findings are all accepted."""
+    if whitelist_file.lower().endswith(WHITELIST_EXTENSIONS):
+        return read_whitelist(whitelist_file, root)
+    return read_baseline(whitelist_file, root)
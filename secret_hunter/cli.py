@@ -1,20 +1,64 @@
+import os
 import argparse
 from secret_hunter.auth_check import confirm_authorization
-from secret_hunter.fetcher import fetch_source
 from secret_hunter.scanner import scan_directory
-from secret_hunter.remediation import generate_report
+from secret_hunter.remediation import REPORT_WRITERS, generate_report, merge_reports
+from secret_hunter.stats import ScanStats
+from secret_hunter.archive_scan import DEFAULT_ARCHIVE_DEPTH
+from secret_hunter.artifact_cache import DEFAULT_MAX_CACHE_SIZE_MB
+from secret_hunter.triage import build_excludes, in_shard, parse_shard, subdirectory_exclude
+from secret_hunter.decompiler import DECOMPILER_BACKENDS
+
+# Fetching, git scanning, batches and the daemon are imported where they are
+# used, so a local scan never loads git, requests or tqdm.
+
+def _shard(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def _given(args, names):
+    """Returns the command-line spelling of the options among names that were given."""
+    return [f"--{name.replace('_', '-')}" for name in names if getattr(args, name)]
 
 def main():
     parser = argparse.ArgumentParser(description="secret-hunter: A tool for finding exposed secrets in software packages.")
     parser.add_argument("--target", help="Path to the target file or directory.")
     parser.add_argument("--type", choices=["auto", "jar", "apk", "bin", "dir", "file"], default="auto", help="Type of the target.")
     parser.add_argument("--output", default="report.json", help="Path to the output report file.")
+    parser.add_argument("--format", choices=sorted(REPORT_WRITERS), default="json", help="Format of the report. jsonl and sarif are written as findings arrive.")
     parser.add_argument("--rules", default="rules.yml", help="Path to the rules file.")
-    parser.add_argument("--whitelist", help="Path to the whitelist file.")
+    parser.add_argument("--whitelist", help="YAML whitelist of accepted findings (by rule id, secret and path glob), or a previous report whose findings are all accepted. Accepted findings are never reported.")
+    parser.add_argument("--baseline", help="Previous report (json, jsonl or sarif) of known findings. Known findings are marked with \"baseline\": true.")
+    parser.add_argument("--new-only", action="store_true", help="Only report findings that are not in --baseline.")
     parser.add_argument("--no-decompile", action="store_true", help="Only perform string extraction.")
+    parser.add_argument("--decompiler", choices=["auto"] + sorted(DECOMPILER_BACKENDS), default="auto", help="Backend for jar, apk, dex and class files. auto uses jadx when it is installed and string extraction otherwise.")
     parser.add_argument("--confirm-authorization", action="store_true", help="Require explicit authorization before running.")
-    parser.add_argument("--max-depth", type=int, default=10, help="Maximum depth for directory scanning.")
+    parser.add_argument("--max-depth", type=int, default=10, help="Maximum depth of directories below the target to scan.")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN", help=".gitignore-style pattern of files or directories to skip. Can be repeated.")
+    parser.add_argument("--exclude-from", action="append", default=[], metavar="FILE", help="Read exclude patterns from a .gitignore-style file. Can be repeated.")
+    parser.add_argument("--no-default-excludes", action="store_true", help="Also scan VCS directories, node_modules and lockfiles, which are skipped by default.")
+    parser.add_argument("--max-file-size", type=int, help="Skip files larger than this many MB.")
+    parser.add_argument("--profile", action="store_true", help="Record per-rule matching time, bytes read and I/O time of a directory scan, add them to the report and print a summary.")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes for scanning (0 uses all CPUs).")
+    parser.add_argument("--incremental", action="store_true", help="Reuse findings of unchanged files from a scan cache in --cache-dir.")
+    parser.add_argument("--scan-archives", action="store_true", help="Scan zip/tar archives member by member without extracting them.")
+    parser.add_argument("--archive-depth", type=int, default=DEFAULT_ARCHIVE_DEPTH, help="Maximum nesting depth for --scan-archives (e.g. a jar inside a zip is depth 2).")
+    parser.add_argument("--shard", type=_shard, metavar="I/N", help="Only scan shard I of N (numbered from 1): the files, git blobs or manifest sources whose path, sha or URL hashes to it. Combine the reports of all shards with the merge command.")
+
+    subparsers = parser.add_subparsers(dest="command", title="Commands")
+    merge_parser = subparsers.add_parser("merge", help="Merge partial reports, such as those of --shard runs, into one report.")
+    merge_parser.add_argument("reports", nargs="+", help="Reports to merge, in json, jsonl or sarif format.")
+    merge_parser.add_argument("--output", default="report.json", help="Path to the merged report.")
+    merge_parser.add_argument("--format", choices=sorted(REPORT_WRITERS), default="json", help="Format of the merged report.")
     
+    # Daemon arguments
+    daemon_group = parser.add_argument_group('Daemon Options', 'Keep rules and the scan cache warm for secret_hunter.client')
+    daemon_group.add_argument("--serve", action="store_true", help="Run as a daemon that answers scan requests from secret_hunter.client.")
+    daemon_group.add_argument("--socket", help="Unix socket to listen on (default: --cache-dir/daemon.sock).")
+    daemon_group.add_argument("--port", type=int, help="Listen on this localhost TCP port instead of a Unix socket. Clients must send the token written to --cache-dir/daemon.token.")
+
     # Fetcher arguments
     fetch_group = parser.add_argument_group('Fetcher Options', 'Control how remote sources are fetched')
     fetch_group.add_argument("--fetch", action="store_true", help="Enable fetching from a remote source.")
@@ -22,23 +66,86 @@ def main():
     fetch_group.add_argument("--source-type", choices=["auto", "git", "archive"], default="auto", help="Type of the remote source.")
     fetch_group.add_argument("--branch", help="Branch to checkout for git repositories.")
     fetch_group.add_argument("--tag", help="Tag to checkout for git repositories.")
+    fetch_group.add_argument("--git-depth", type=int, help="Only fetch this many commits of the branch or tag (1 for a shallow clone).")
+    fetch_group.add_argument("--blobless", action="store_true", help="Partial clone (--filter=blob:none): file contents are downloaded only when checked out or read.")
+    fetch_group.add_argument("--sparse", action="append", metavar="DIR", help="Only check out this directory of the repository, plus top-level files. Can be repeated.")
     fetch_group.add_argument("--cache-dir", default=".cache", help="Directory to cache downloaded artifacts.")
+    fetch_group.add_argument("--max-cache-size", type=int, default=DEFAULT_MAX_CACHE_SIZE_MB, help="Maximum size in MB of downloaded and extracted archives kept in --cache-dir. Least recently used ones are evicted.")
     fetch_group.add_argument("--max-download-size", type=int, default=100, help="Maximum download size in MB.")
     fetch_group.add_argument("--timeout", type=int, default=60, help="Timeout for network operations in seconds.")
     fetch_group.add_argument("--verify-license", action="store_true", default=True, help="Verify the license of the remote source.")
     fetch_group.add_argument("--dry-run", action="store_true", help="Perform a dry run without downloading files.")
     fetch_group.add_argument("--verify-checksum", help="Expected SHA256 checksum of the downloaded archive.")
+    fetch_group.add_argument("--chunk-size", type=int, help="Download chunk size in KB (default: 1024).")
+    fetch_group.add_argument("--manifest", help="File listing one source URL per line (optionally followed by its SHA256) to fetch and scan as a batch.")
+    fetch_group.add_argument("--max-connections", type=int, help="Maximum number of concurrent downloads and clones in --manifest mode (default: 8).")
+
+    # Git arguments
+    git_group = parser.add_argument_group('Git Options', 'Scan blobs from the git object database instead of the working tree')
+    git_scope = git_group.add_mutually_exclusive_group()
+    git_scope.add_argument("--since", help="Only scan blobs changed by commits after this ref (REF..HEAD).")
+    git_scope.add_argument("--commit-range", help="Only scan blobs changed by commits in this range, e.g. A..B.")
+    git_scope.add_argument("--history", action="store_true", help="Scan every unique blob in the history of all branches and tags.")
 
 
     args = parser.parse_args()
 
+    if args.command == "merge":
+        findings, stats = merge_reports(args.reports)
+        generate_report(findings, args.output, args.format, stats)
+        return
+
     confirm_authorization(args.confirm_authorization)
+    if args.new_only and not args.baseline:
+        parser.error("--new-only requires --baseline.")
+
+    if args.serve:
+        # Requests name their own paths and get every finding back, so options that pick the target or
+        # filter and profile a single run's findings have no meaning for the daemon.
+        unsupported = _given(args, ["target", "fetch", "manifest", "whitelist", "baseline", "profile", "shard",
+                                    "history", "since", "commit_range"])
+        if args.type != "auto":
+            unsupported.append("--type")
+        if unsupported:
+            parser.error(f"--serve cannot be combined with {', '.join(unsupported)}.")
+        from secret_hunter.daemon import DEFAULT_SOCKET_NAME, DEFAULT_TOKEN_NAME, ScanService, make_server, serve
+        cache_path = os.path.join(args.cache_dir, "scan-cache.sqlite3") if args.incremental else None
+        service = ScanService(args.rules, cache_path=cache_path, decompile_dir=os.path.join(args.cache_dir, "decompiled"),
+                              no_decompile=args.no_decompile, decompiler=args.decompiler,
+                              archive_depth=args.archive_depth if args.scan_archives else 0, max_depth=args.max_depth,
+                              excludes=build_excludes(args.exclude, args.exclude_from, not args.no_default_excludes),
+                              max_file_size=args.max_file_size * 1024 * 1024 if args.max_file_size else None,
+                              cache_dir=args.cache_dir)
+        serve(make_server(service, args.socket or os.path.join(args.cache_dir, DEFAULT_SOCKET_NAME), args.port,
+                          os.path.join(args.cache_dir, DEFAULT_TOKEN_NAME)))
+        return
+
+    if args.manifest:
+        unsupported = _given(args, ["target", "fetch", "history", "since", "commit_range"])
+        if unsupported:
+            parser.error(f"--manifest cannot be combined with {', '.join(unsupported)}.")
+        from secret_hunter.pipeline import read_manifest, run_batch
+        targets = read_manifest(args.manifest)
+        if args.shard:
+            targets = [(source_url, checksum) for source_url, checksum in targets if in_shard(source_url, args.shard)]
+        if args.dry_run:
+            print("Dry run enabled. No files will be downloaded or extracted.")
+            for source_url, _ in targets:
+                print(f"Would fetch and scan {source_url}")
+            print("Dry run complete.")
+            return
+        stats = ScanStats() if args.profile else None
+        generate_report(run_batch(args, targets, stats), args.output, args.format, stats)
+        if stats is not None:
+            print(stats.format_table())
+        return
 
     target_path = None
     if args.fetch:
         if not args.source_url:
             parser.error("--source-url is required when --fetch is enabled.")
         
+        from secret_hunter.fetcher import fetch_source
         target_path = fetch_source(args)
         
         if args.dry_run:
@@ -47,12 +154,48 @@ def main():
             
     elif args.target:
         target_path = args.target
+        if not os.path.exists(target_path):
+            parser.error(f"--target does not exist: {target_path}")
+        if args.type == "dir" and not os.path.isdir(target_path):
+            parser.error(f"--type dir requires a directory: {target_path}")
     else:
-        parser.error("--target is required unless --fetch is enabled.")
+        parser.error("--target is required unless --fetch or --manifest is enabled.")
     
     if target_path:
-        findings = scan_directory(target_path, args.rules, args.whitelist, args.no_decompile, args.max_depth)
-        generate_report(findings, args.output)
+        stats = None
+        if args.history or args.since or args.commit_range:
+            from secret_hunter.baseline import load_whitelist, read_baseline
+            from secret_hunter.git_scan import scan_git_history, scan_git_range
+            if args.history:
+                findings = scan_git_history(target_path, args.rules, args.shard)
+            else:
+                rev_range = args.commit_range or f"{args.since}..HEAD"
+                findings = scan_git_range(target_path, rev_range, args.rules, args.shard)
+            # Git findings carry paths relative to the repository, like the whitelist globs.
+            if args.whitelist:
+                findings = load_whitelist(args.whitelist).filter(findings)
+            if args.baseline:
+                known = read_baseline(args.baseline)
+                findings = known.filter(findings) if args.new_only else known.mark(findings)
+        else:
+            cache_path = os.path.join(args.cache_dir, "scan-cache.sqlite3") if args.incremental else None
+            archive_depth = args.archive_depth if args.scan_archives else 0
+            excludes = build_excludes(args.exclude, args.exclude_from, not args.no_default_excludes)
+            # The rules cache, scan cache and decompiled output would otherwise be scanned as part of the target.
+            cache_exclude = subdirectory_exclude(target_path, args.cache_dir)
+            if cache_exclude:
+                excludes.append(cache_exclude)
+            max_file_size = args.max_file_size * 1024 * 1024 if args.max_file_size else None
+            stats = ScanStats() if args.profile else None
+            findings = scan_directory(target_path, args.rules, args.whitelist, args.no_decompile, args.max_depth,
+                                      jobs=args.jobs, cache_path=cache_path, archive_depth=archive_depth,
+                                      excludes=excludes, max_file_size=max_file_size, target_type=args.type,
+                                      decompiler=args.decompiler, decompile_dir=os.path.join(args.cache_dir, "decompiled"),
+                                      stats=stats, rules_cache_dir=args.cache_dir, baseline_file=args.baseline,
+                                      new_only=args.new_only, shard=args.shard)
+        generate_report(findings, args.output, args.format, stats)
+        if stats is not None:
+            print(stats.format_table())
     else:
         print("No target to scan. Exiting.")
 
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import socket
+import argparse
+
+# Thin client for the scan daemon (cli.py --serve). It only imports the
+# standard library, so a pre-commit hook pays for little more than
+# interpreter startup and one round trip over the socket.
+
+DEFAULT_SOCKET = os.path.join(".cache", "daemon.sock")
+DEFAULT_TOKEN_FILE = os.path.join(".cache", "daemon.token")
+
+
+def request(message, socket_path=DEFAULT_SOCKET, port=None, timeout=None, token_file=DEFAULT_TOKEN_FILE):
+    """
+    Sends one request to the daemon and returns its decoded response. Over
+    TCP, the request carries the token the daemon wrote to token_file.
+    """
+    if port is None:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = socket_path
+    else:
+        with open(token_file, "r") as f:
+            message = dict(message, token=f.read().strip())
+        conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ("127.0.0.1", port)
+    with conn:
+        conn.settimeout(timeout)
+        conn.connect(address)
+        conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with conn.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("The daemon closed the connection without answering.")
+    return json.loads(line)
+
+
+def scan(paths, socket_path=DEFAULT_SOCKET, port=None, timeout=None, token_file=DEFAULT_TOKEN_FILE):
+    """
+    Scans paths with the daemon. Paths are sent as absolute paths, since the
+    daemon may run elsewhere, and findings are reported under the paths as
+    given.
+    """
+    absolute = [os.path.abspath(path) for path in paths]
+    response = request({"command": "scan", "paths": absolute}, socket_path, port, timeout, token_file)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    findings = []
+    for path, abspath, results in zip(paths, absolute, response["results"]):
+        for finding in results:
+            finding["file"] = path + finding["file"][len(abspath):]
+            findings.append(finding)
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan files with a running secret-hunter daemon.")
+    parser.add_argument("paths", nargs="*", help="Files or directories to scan.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket of the daemon.")
+    parser.add_argument("--port", type=int, help="Localhost TCP port of the daemon, instead of --socket.")
+    parser.add_argument("--token-file", default=DEFAULT_TOKEN_FILE, help="File holding the token of a --port daemon.")
+    parser.add_argument("--output", help="Also write the findings to this JSON file.")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for the daemon.")
+    parser.add_argument("--ping", action="store_true", help="Check that the daemon is running.")
+    parser.add_argument("--stop", action="store_true", help="Stop the daemon.")
+    args = parser.parse_args()
+
+    try:
+        if args.ping or args.stop:
+            print(json.dumps(request({"command": "shutdown" if args.stop else "ping"}, args.socket, args.port, args.timeout,
+                                     args.token_file)))
+            return 0
+        findings = scan(args.paths, args.socket, args.port, args.timeout, args.token_file)
+    except (OSError, RuntimeError) as e:
+        print(f"Error talking to the secret-hunter daemon: {e}", file=sys.stderr)
+        return 2
+
+    for finding in findings:
+        print(f"{finding['file']}:{finding['line']}: {finding['type']} ({finding['id']}, {finding['confidence']})")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(findings, f, indent=4)
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
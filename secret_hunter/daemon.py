@@ -0,0 +1,203 @@
+import os
+import hmac
+import json
+import secrets
+import socket
+import socketserver
+from secret_hunter.decompiler import get_backend
+from secret_hunter.rules import load_rules
+from secret_hunter.scan_cache import ScanCache
+from secret_hunter.scanner import _RuleSubsetScanner
+from secret_hunter.triage import DEFAULT_EXCLUDES, subdirectory_exclude, walk_files
+
+DEFAULT_SOCKET_NAME = "daemon.sock"
+DEFAULT_TOKEN_NAME = "daemon.token"
+
+
+class ScanService:
+    """
+    The state a daemon keeps warm between requests: the loaded rules, their
+    compiled rule sets, the decompile cache and an open scan cache. The rules
+    are reloaded when the rules file changes on disk.
+
+    Options match those of scan_directory, so a daemon and an --incremental
+    CLI run with the same settings share scan cache entries. The cache_dir,
+    if given, is never scanned as part of a requested directory.
+    """
+
+    def __init__(self, rules_file, cache_path=None, decompile_dir=None, no_decompile=False, decompiler="auto",
+                 archive_depth=0, max_depth=10, excludes=DEFAULT_EXCLUDES, max_file_size=None, cache_dir=None):
+        self.rules_file = rules_file
+        self.cache_dir = cache_dir
+        self.cache_path = cache_path
+        self.decompile_dir = decompile_dir
+        self.max_depth = max_depth
+        self.excludes = excludes
+        self.max_file_size = max_file_size
+        self.options = {"archive_depth": archive_depth, "target_type": "auto",
+                        "decompiler": get_backend(decompiler, no_decompile).name}
+        self.rules_mtime = None
+        self.scanner = None
+        self.cache = None
+        self._load()
+
+    def _load(self):
+        self.rules_mtime = os.stat(self.rules_file).st_mtime_ns
+        self.scanner = _RuleSubsetScanner(load_rules(self.rules_file), self.options, self.decompile_dir)
+
+    def _reload_if_changed(self):
+        if os.stat(self.rules_file).st_mtime_ns != self.rules_mtime:
+            self.close()
+            self._load()
+
+    def scan(self, paths):
+        """Returns a list of findings for each of the given files and directories, ordered by file and line."""
+        self._reload_if_changed()
+        if self.cache_path and self.cache is None:
+            # Opened on first use, in the thread that serves requests, as SQLite requires.
+            self.cache = ScanCache(self.cache_path, self.scanner.rules, self.options)
+        results = []
+        for path in paths:
+            findings = []
+            if not os.path.exists(path):
+                print(f"Error scanning file {path}: no such file or directory")
+            excludes = self.excludes
+            cache_exclude = subdirectory_exclude(path, self.cache_dir) if self.cache_dir else None
+            if cache_exclude:
+                excludes = list(excludes) + [cache_exclude]
+            for filepath, _ in sorted(walk_files(path, self.max_depth, excludes, self.max_file_size)):
+                findings.extend(self._scan_file(filepath))
+            results.append(findings)
+        if self.cache is not None:
+            self.cache.conn.commit()
+        return results
+
+    def _scan_file(self, filepath):
+        if self.cache is None:
+            return self.scanner.scan(filepath)
+        try:
+            entry = self.cache.lookup(filepath)
+        except OSError:
+            return self.scanner.scan(filepath)
+        if entry.missing:
+            return self.cache.store(entry, self.scanner.scan(filepath, entry.missing))
+        return entry.findings()
+
+    def handle(self, request):
+        """Answers one decoded request."""
+        command = request.get("command")
+        if command == "scan":
+            return {"results": self.scan(request.get("paths", []))}
+        if command == "ping":
+            return {"rules": len(self.scanner.rules)}
+        return {"error": f"unknown command: {command}"}
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Reads one JSON request per line and writes one JSON response per line.
+    When the server has a token, a request without it is refused and the
+    connection closed.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if self.server.token is not None and not hmac.compare_digest(
+                        str(request.get("token", "")).encode("utf-8"), self.server.token.encode("utf-8")):
+                    self.wfile.write(json.dumps({"error": "invalid or missing token"}).encode("utf-8") + b"\n")
+                    return
+                if request.get("command") == "shutdown":
+                    self.server.stopped = True
+                    response = {"stopped": True}
+                else:
+                    response = self.server.service.handle(request)
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response, default=dict).encode("utf-8") + b"\n")
+            self.wfile.flush()
+            if self.server.stopped:
+                return
+
+
+def _remove_stale_socket(path):
+    """Removes a socket file left behind by a daemon that is no longer running."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def write_token(token_path):
+    """Writes a new random token to a file readable only by the current user and returns it."""
+    directory = os.path.dirname(token_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    token = secrets.token_hex(32)
+    fd = os.open(token_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        os.chmod(token_path, 0o600)
+        f.write(token)
+    return token
+
+
+def make_server(service, socket_path=None, port=None, token_path=None):
+    """
+    Creates the daemon's server: on a Unix socket readable only by the current
+    user, or on localhost TCP when a port is given or Unix sockets are not
+    available. Any local user can connect over TCP, so there every request
+    must carry the token written to token_path (by default next to the
+    socket), which only the current user can read. Requests are answered one
+    at a time, so the warm state needs no locking.
+    """
+    if port is None and socket_path and hasattr(socket, "AF_UNIX"):
+        directory = os.path.dirname(socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _remove_stale_socket(socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            server = socketserver.UnixStreamServer(socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        server.token = server.token_path = None
+    else:
+        if token_path is None:
+            token_path = os.path.join(os.path.dirname(socket_path or "") or os.curdir, DEFAULT_TOKEN_NAME)
+        server = socketserver.TCPServer(("127.0.0.1", port or 0), _RequestHandler)
+        server.token = write_token(token_path)
+        server.token_path = token_path
+    server.service = service
+    server.stopped = False
+    return server
+
+
+def serve(server):
+    """Answers requests until a shutdown request arrives or the process is interrupted."""
+    address = server.server_address
+    print(f"secret-hunter daemon listening on {address if isinstance(address, str) else '%s:%d' % address}")
+    try:
+        while not server.stopped:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+        if server.token_path and os.path.exists(server.token_path):
+            os.unlink(server.token_path)
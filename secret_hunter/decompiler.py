@@ -1,11 +1,298 @@
+import io
+import os
+import json
+import shutil
+import struct
+import hashlib
+import zipfile
+import threading
+import subprocess
+from secret_hunter.archive_scan import MEMBER_SEPARATOR
+from secret_hunter.scan_cache import file_digest
+from secret_hunter.scanner import scan_file, scan_lines
+from secret_hunter.triage import is_media_name
+
+# Artifacts that go through the decompilation stage instead of a plain scan.
+DECOMPILE_EXTENSIONS = (".jar", ".apk", ".aar", ".war", ".ear", ".dex", ".class")
+# Members of an artifact that are artifacts themselves and are decompiled (and cached) on their own.
+NESTED_EXTENSIONS = (".jar", ".apk", ".aar", ".war", ".ear")
+CLASS_MAGIC = b"\xca\xfe\xba\xbe"
+DEX_MAGIC = b"dex\n"
+ZIP_MAGIC = b"PK\x03\x04"
+# Byte sizes of the class-file constant pool entries that are skipped over.
+CONSTANT_SIZES = {3: 4, 4: 4, 7: 2, 9: 4, 10: 4, 11: 4, 12: 4, 15: 3, 16: 2, 17: 4, 18: 4, 19: 2, 20: 2}
+FILES_DIR = "files"
+NESTED_FILE = "nested.json"
+JADX_TIMEOUT = 600
+
+
+def _decode_mutf8(data):
+    """Decodes the modified UTF-8 used by class and dex files."""
+    data = data.replace(b"\xc0\x80", b"\0")
+    try:
+        return data.decode("utf-8", errors="surrogatepass").encode("utf-16", errors="surrogatepass").decode("utf-16")
+    except UnicodeError:
+        return data.decode("utf-8", errors="replace")
+
+
+def class_strings(data):
+    """Returns the string literals of a Java class file, read from its constant pool."""
+    if not data.startswith(CLASS_MAGIC) or len(data) < 10:
+        return []
+    count = struct.unpack_from(">H", data, 8)[0]
+    utf8 = {}
+    string_refs = []
+    offset = 10
+    index = 1
+    try:
+        while index < count:
+            tag = data[offset]
+            if tag == 1:
+                length = struct.unpack_from(">H", data, offset + 1)[0]
+                utf8[index] = data[offset + 3:offset + 3 + length]
+                offset += 3 + length
+            elif tag == 8:
+                string_refs.append(struct.unpack_from(">H", data, offset + 1)[0])
+                offset += 3
+            elif tag in (5, 6):
+                # Longs and doubles take up two constant pool slots.
+                offset += 9
+                index += 1
+            elif tag in CONSTANT_SIZES:
+                offset += 1 + CONSTANT_SIZES[tag]
+            else:
+                break
+            index += 1
+    except (IndexError, struct.error):
+        pass
+    return [_decode_mutf8(utf8[ref]) for ref in string_refs if ref in utf8]
+
+
+def dex_strings(data):
+    """
+    Returns the strings of a dex file's string table, leaving out the type
+    descriptors (such as "Lcom/example/Foo;") that make up most of it.
+    """
+    if not data.startswith(DEX_MAGIC) or len(data) < 0x70:
+        return []
+    string_ids_size, string_ids_off, type_ids_size, type_ids_off = struct.unpack_from("<IIII", data, 0x38)
+    strings = []
+    try:
+        type_names = set(struct.unpack_from(f"<{type_ids_size}I", data, type_ids_off))
+        for index in range(string_ids_size):
+            if index in type_names:
+                continue
+            offset = struct.unpack_from("<I", data, string_ids_off + 4 * index)[0]
+            # Skip the uleb128 length, counted in UTF-16 units, and read up to the NUL terminator.
+            while data[offset] & 0x80:
+                offset += 1
+            offset += 1
+            strings.append(_decode_mutf8(data[offset:data.index(b"\0", offset)]))
+    except (IndexError, ValueError, struct.error):
+        pass
+    return strings
+
+
+def _member_output_path(output_dir, name):
+    """Returns where a member is written below output_dir, or None if its name would escape it."""
+    path = os.path.normpath(name.lstrip("/"))
+    if os.path.isabs(path) or path == os.curdir or path.split(os.sep)[0] == os.pardir:
+        return None
+    return os.path.join(output_dir, FILES_DIR, path)
+
+
+def _write_strings(path, strings):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", errors="replace") as f:
+        for string in strings:
+            f.write(string + "\n")
+
+
+class StringsBackend:
+    """
+    Pure-Python fast path that needs no external tool. Class files are reduced
+    to their constant-pool string literals and dex files to their string
+    tables. Other members are kept as they are, media files are dropped, and
+    nested jars are decoded once into their own cache entries.
+    """
+
+    name = "strings"
+
+    def available(self):
+        return True
+
+    def decompile(self, source, output_dir, cache):
+        """Decodes a zip artifact (a path or a seekable file object) into output_dir. Returns False if it is not one."""
+        if not zipfile.is_zipfile(source):
+            return False
+        nested = {}
+        with zipfile.ZipFile(source) as zipf:
+            for info in zipf.infolist():
+                name = info.filename
+                path = _member_output_path(output_dir, name)
+                if info.is_dir() or path is None or is_media_name(name):
+                    continue
+                lower = name.lower()
+                if lower.endswith(".class"):
+                    _write_strings(path, class_strings(zipf.read(info)))
+                elif lower.endswith(".dex"):
+                    _write_strings(path, dex_strings(zipf.read(info)))
+                elif lower.endswith(NESTED_EXTENSIONS):
+                    data = zipf.read(info)
+                    digest = hashlib.sha256(data).hexdigest()
+                    if cache.decompile(io.BytesIO(data), digest) is not None:
+                        nested[name] = digest
+                    else:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with open(path, "wb") as f:
+                            f.write(data)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with zipf.open(info) as member, open(path, "wb") as f:
+                        shutil.copyfileobj(member, f)
+        with open(os.path.join(output_dir, NESTED_FILE), "w") as f:
+            json.dump(nested, f)
+        return True
+
+
+class JadxBackend:
+    """Decompiles whole artifacts to Java sources and decoded resources with jadx."""
+
+    name = "jadx"
+
+    def available(self):
+        return shutil.which("jadx") is not None
+
+    def decompile(self, source, output_dir, cache):
+        """Runs jadx on an artifact path. Nested artifacts are left to jadx itself."""
+        if not isinstance(source, str):
+            return False
+        # jadx exits non-zero when a few methods fail to decompile, but the rest of its output is still usable.
+        subprocess.run(["jadx", "-d", os.path.join(output_dir, FILES_DIR), source],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=JADX_TIMEOUT)
+        return os.path.isdir(os.path.join(output_dir, FILES_DIR))
+
+
+DECOMPILER_BACKENDS = {
+    "strings": StringsBackend,
+    "jadx": JadxBackend,
+}
+
+
+def get_backend(name="auto", no_decompile=False):
+    """
+    Returns the decompiler backend to use. With no_decompile only the string
+    extraction fast path is used; "auto" prefers jadx when it is installed.
+    """
+    if no_decompile:
+        return StringsBackend()
+    if name == "auto":
+        jadx = JadxBackend()
+        return jadx if jadx.available() else StringsBackend()
+    backend = DECOMPILER_BACKENDS[name]()
+    if not backend.available():
+        print(f"Decompiler {name} is not available. Falling back to string extraction.")
+        return StringsBackend()
+    return backend
+
+
+class DecompileCache:
+    """
+    Decompilation output stored by artifact hash under
+    <cache_dir>/<backend>/<sha256>/, so an artifact is decoded once however
+    many times and in however many containers it appears. Entries are built
+    in a private directory and renamed into place, so concurrent workers never
+    see a partial entry.
+    """
+
+    def __init__(self, cache_dir, backend):
+        self.root = os.path.join(cache_dir, backend.name)
+        self.backend = backend
+        os.makedirs(self.root, exist_ok=True)
+
+    def entry(self, digest):
+        return os.path.join(self.root, digest)
+
+    def decompile(self, source, digest):
+        """Returns the entry directory of an artifact, decompiling it on a miss, or None if it cannot be decoded."""
+        entry = self.entry(digest)
+        if os.path.isdir(entry):
+            return entry
+        build_dir = f"{entry}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(build_dir, ignore_errors=True)
+        os.makedirs(build_dir)
+        try:
+            if not self.backend.decompile(source, build_dir, self):
+                shutil.rmtree(build_dir)
+                return None
+            try:
+                os.rename(build_dir, entry)
+            except OSError:
+                # Another worker finished the same artifact first.
+                shutil.rmtree(build_dir)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+        return entry
+
+    def iter_files(self, entry, prefix=""):
+        """Yields (path on disk, member path) for every decoded file of an entry and of its nested entries."""
+        files_dir = os.path.join(entry, FILES_DIR)
+        for root, dirs, files in os.walk(files_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                yield path, prefix + os.path.relpath(path, files_dir).replace(os.sep, "/")
+        nested_file = os.path.join(entry, NESTED_FILE)
+        if os.path.exists(nested_file):
+            with open(nested_file, "r") as f:
+                nested = json.load(f)
+            for name, digest in sorted(nested.items()):
+                yield from self.iter_files(self.entry(digest), prefix + name + MEMBER_SEPARATOR)
+
+
+def is_decompilable(path):
+    """Returns True if the path has the extension of a jar, apk, dex or class file."""
+    return path.lower().endswith(DECOMPILE_EXTENSIONS)
+
+
+def scan_artifact(artifact_path, rules, cache):
+    """
+    Decompiles a jar, apk, dex or class file and scans the result. Findings
+    in members are reported as "app.apk!/lib/a.jar!/com/example/Config.class".
+    Returns None if the file is not an artifact the decompiler understands.
+    """
+    with open(artifact_path, "rb") as f:
+        head = f.read(4)
+        if head == CLASS_MAGIC or head == DEX_MAGIC:
+            data = head + f.read()
+            strings = class_strings(data) if head == CLASS_MAGIC else dex_strings(data)
+            return scan_lines(strings, artifact_path, rules)
+    if head != ZIP_MAGIC:
+        return None
+
+    entry = cache.decompile(artifact_path, file_digest(artifact_path))
+    if entry is None:
+        return None
+    findings = []
+    for path, member in cache.iter_files(entry):
+        display_path = f"{artifact_path}{MEMBER_SEPARATOR}{member}"
+        findings.extend(finding.with_file(display_path) for finding in scan_file(path, rules))
+    return findings
+
+
 def decompile_apk(apk_path, output_dir):
-    """Decompiles an APK file."""
-    print(f"Decompiling {apk_path} to {output_dir}...")
-    # In a real implementation, this would use apktool and jadx
-    pass
+    """Decompiles an APK file into a cache under output_dir and returns the directory of decoded files."""
+    return _decompile(apk_path, output_dir)
+
 
 def decompile_jar(jar_path, output_dir):
-    """Decompiles a JAR file."""
-    print(f"Decompiling {jar_path} to {output_dir}...")
-    # In a real implementation, this would use jd-cli or fernflower
-    pass
+    """Decompiles a JAR file into a cache under output_dir and returns the directory of decoded files."""
+    return _decompile(jar_path, output_dir)
+
+
+def _decompile(artifact_path, output_dir):
+    print(f"Decompiling {artifact_path} to {output_dir}...")
+    cache = DecompileCache(output_dir, get_backend())
+    entry = cache.decompile(artifact_path, file_digest(artifact_path))
+    return None if entry is None else os.path.join(entry, FILES_DIR)
@@ -0,0 +1,71 @@
+from collections import Counter
+from math import ceil, log2
+
+# Character classes of the token alphabets entropy rules can target. "_"
+# is left out of base64 so snake_case identifiers split into their words, and
+# "=" may only end a token, as padding, so `name=value` splits at the "=".
+CHARSETS = {
+    "base64": "[A-Za-z0-9+/-]",
+    "hex": "[0-9a-fA-F]",
+}
+PADDING = {
+    "base64": "={0,2}",
+}
+
+
+def calculate_entropy(text):
+    """Calculates the Shannon entropy of a string (or bytes) in a single pass."""
+    if not text:
+        return 0
+    length = len(text)
+    entropy = 0
+    for count in Counter(text).values():
+        frequency = count / length
+        entropy -= frequency * log2(frequency)
+    return entropy
+
+
+def effective_min_length(min_length, threshold):
+    """
+    Returns the shortest token worth checking. A token of n characters has an
+    entropy of at most log2(n), so tokens shorter than 2 ** threshold never pass.
+    """
+    return max(int(min_length), ceil(2 ** threshold))
+
+
+def token_regex(charset, min_length):
+    """Builds the pattern that finds candidate tokens of a charset."""
+    if charset not in CHARSETS:
+        raise ValueError(f"Unknown entropy charset: {charset}")
+    return f"{CHARSETS[charset]}{{{min_length},}}{PADDING.get(charset, '')}"
+
+
+def candidate_regex(charsets, min_length):
+    """
+    Builds one pattern whose matches contain every token of any of the
+    charsets, so a line is split into candidate tokens in a single pass.
+    """
+    classes = sorted({CHARSETS[charset] for charset in charsets})
+    padding = max((PADDING.get(charset, "") for charset in charsets), key=len)
+    if len(classes) == 1:
+        return f"{classes[0]}{{{min_length},}}{padding}"
+    return f"(?:{'|'.join(classes)}){{{min_length},}}{padding}"
+
+
+def is_high_entropy(token, threshold):
+    """
+    Returns True if the token's entropy reaches the threshold. A token with k
+    distinct characters has an entropy of at most log2(k), which rejects most
+    identifiers and words without building a histogram. A token of decimal
+    digits only is a number, such as an ID or a timestamp, and never passes;
+    without this, long numbers would reach the threshold of the hex charset.
+    """
+    return not token.isdigit() and len(set(token)) >= 2 ** threshold and calculate_entropy(token) >= threshold
+
+
+def has_high_entropy_token(pattern, text, threshold):
+    """Returns True if any token of the pattern in the text reaches the entropy threshold."""
+    for token in pattern.findall(text):
+        if is_high_entropy(token, threshold):
+            return True
+    return False
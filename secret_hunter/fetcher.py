@@ -7,58 +7,149 @@ import hashlib
 from tqdm import tqdm
 from urllib.parse import urlparse
 from secret_hunter.auth_check import confirm_license
+from secret_hunter.archive_scan import find_license_in_archive
+from secret_hunter.artifact_cache import DEFAULT_MAX_CACHE_SIZE_MB, ArtifactCache, url_key
 
-def _get_cache_path(url, cache_dir):
-    """Generates a cache path for a given URL."""
-    parsed_url = urlparse(url)
-    filename = os.path.basename(parsed_url.path)
-    return os.path.join(cache_dir, filename)
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# A download interrupted by a dropped connection is resumed this many times before giving up.
+DOWNLOAD_ATTEMPTS = 3
 
-def _verify_checksum(filepath, expected_checksum):
-    """Verifies the checksum of a downloaded file."""
+def _hash_file(filepath, hasher, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Feeds a file into a hasher chunk by chunk."""
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher
+
+def _check_digest(name, calculated_checksum, expected_checksum):
+    """Compares a calculated SHA256 with the expected one and reports the result."""
     if not expected_checksum:
         return True
-    
-    hasher = hashlib.sha256()
-    with open(filepath, 'rb') as f:
-        buf = f.read()
-        hasher.update(buf)
-    
-    calculated_checksum = hasher.hexdigest()
+
     if calculated_checksum.lower() == expected_checksum.lower():
-        print(f"Checksum verified for {os.path.basename(filepath)}")
+        print(f"Checksum verified for {name}")
         return True
     else:
-        print(f"Checksum mismatch for {os.path.basename(filepath)}.")
+        print(f"Checksum mismatch for {name}.")
         print(f"  Expected: {expected_checksum}")
         print(f"  Got:      {calculated_checksum}")
         return False
 
+def _verify_checksum(filepath, expected_checksum):
+    """Verifies the checksum of a file on disk, reading it in chunks."""
+    if not expected_checksum:
+        return True
+    calculated_checksum = _hash_file(filepath, hashlib.sha256()).hexdigest()
+    return _check_digest(os.path.basename(filepath), calculated_checksum, expected_checksum)
+
+
+def _validator(response):
+    """
+    Returns the validator of a download that can be sent back in If-Range:
+    its strong ETag, else its Last-Modified date, or None if it has neither.
+    """
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+def _read_validator(validator_path):
+    try:
+        with open(validator_path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _remove_validator(validator_path):
+    if os.path.exists(validator_path):
+        os.remove(validator_path)
 
-def _download_archive(url, cache_path, max_size_mb, timeout, expected_checksum):
-    """Downloads an archive file with progress and size checks."""
-    response = requests.get(url, stream=True, timeout=timeout)
+def _open_download(get, url, timeout, resume_from, validator=None):
+    """
+    Requests the download, asking for the bytes after resume_from if a partial
+    file exists. The range is sent with If-Range and the partial file's
+    validator, so a server whose file has changed sends it whole, and a
+    partial file without a validator is never resumed. Returns the response
+    and whether the server honoured the range.
+    """
+    if resume_from and validator:
+        response = get(url, stream=True, timeout=timeout,
+                       headers={"Range": f"bytes={resume_from}-", "If-Range": validator})
+        # A server that ignores If-Range but reports a different validator is
+        # serving another file, whose tail must not be appended.
+        reported = [response.headers.get("ETag"), response.headers.get("Last-Modified")]
+        if response.status_code == 206 and (validator in reported or not any(reported)):
+            return response, True
+        response.close()
+    response = get(url, stream=True, timeout=timeout)
     response.raise_for_status()
+    return response, False
+
+def _download_archive(url, cache_path, max_size_mb, timeout, expected_checksum, session=None,
+                      chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Downloads an archive file with progress and size checks, optionally through
+    a pooled session. The SHA256 is computed while the data streams in, so the
+    file is never read back. Data is written to a ".part" file next to
+    cache_path, and a download that is interrupted resumes from it with an HTTP
+    Range request, either on the next attempt or on the next run. The ETag or
+    Last-Modified date of the download is kept in a ".validator" file beside
+    it, so only the same version of the file is resumed. Returns the SHA256 of
+    the downloaded file.
+    """
+    get = session.get if session is not None else requests.get
+    part_path = cache_path + ".part"
+    validator_path = cache_path + ".validator"
+
+    for attempt in range(DOWNLOAD_ATTEMPTS):
+        resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        response, resumed = _open_download(get, url, timeout, resume_from, _read_validator(validator_path))
+        if not resumed:
+            resume_from = 0
+            validator = _validator(response)
+            if validator:
+                with open(validator_path, "w", encoding="utf-8") as f:
+                    f.write(validator)
+            else:
+                _remove_validator(validator_path)
+
+        total_size = int(response.headers.get("content-length", 0)) + resume_from
+        if total_size > max_size_mb * 1024 * 1024:
+            raise ValueError(f"Download size ({total_size / 1024 / 1024:.2f} MB) exceeds the maximum of {max_size_mb} MB.")
+
+        hasher = hashlib.sha256()
+        if resume_from:
+            print(f"Resuming download of {os.path.basename(cache_path)} at {resume_from} bytes")
+            _hash_file(part_path, hasher, chunk_size)
 
-    total_size = int(response.headers.get("content-length", 0))
-    if total_size > max_size_mb * 1024 * 1024:
-        raise ValueError(f"Download size ({total_size / 1024 / 1024:.2f} MB) exceeds the maximum of {max_size_mb} MB.")
-
-    with open(cache_path, "wb") as f, tqdm(
-        desc=f"Downloading {os.path.basename(cache_path)}",
-        total=total_size,
-        unit="iB",
-        unit_scale=True,
-        unit_divisor=1024,
-    ) as bar:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-            bar.update(len(chunk))
-            
-    if not _verify_checksum(cache_path, expected_checksum):
+        try:
+            with open(part_path, "ab" if resume_from else "wb") as f, tqdm(
+                desc=f"Downloading {os.path.basename(cache_path)}",
+                total=total_size,
+                initial=resume_from,
+                unit="iB",
+                unit_scale=True,
+                unit_divisor=1024,
+            ) as bar:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    bar.update(len(chunk))
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == DOWNLOAD_ATTEMPTS - 1:
+                raise
+            print(f"Download of {os.path.basename(cache_path)} interrupted ({e}). Retrying...")
+
+    if not _check_digest(os.path.basename(cache_path), hasher.hexdigest(), expected_checksum):
+        # A corrupt partial file must not be resumed again.
+        os.remove(part_path)
+        _remove_validator(validator_path)
         raise ValueError("Checksum verification failed.")
 
-    return cache_path
+    os.replace(part_path, cache_path)
+    _remove_validator(validator_path)
+    return hasher.hexdigest()
 
 def _extract_archive(archive_path, extract_dir):
     """Extracts an archive to the specified directory."""
@@ -71,23 +162,79 @@ def _extract_archive(archive_path, extract_dir):
     else:
         raise ValueError(f"Unsupported archive type: {archive_path}")
 
-def _fetch_git(url, branch, tag, cache_dir):
-    """Clones a git repository."""
+class _CloneProgress(git.RemoteProgress):
+    """Shows each stage git reports while cloning (receiving objects, resolving deltas...) as a tqdm bar."""
+
+    STAGES = {
+        git.RemoteProgress.COUNTING: "Counting objects",
+        git.RemoteProgress.COMPRESSING: "Compressing objects",
+        git.RemoteProgress.RECEIVING: "Receiving objects",
+        git.RemoteProgress.RESOLVING: "Resolving deltas",
+        git.RemoteProgress.CHECKING_OUT: "Checking out files",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.bar = None
+
+    def update(self, op_code, cur_count, max_count=None, message=""):
+        if op_code & self.BEGIN or self.bar is None:
+            if self.bar is not None:
+                self.bar.close()
+            self.bar = tqdm(total=max_count or None, desc=self.STAGES.get(op_code & self.OP_MASK, "git"), leave=False)
+        self.bar.update(cur_count - self.bar.n)
+        if op_code & self.END:
+            self.bar.close()
+            self.bar = None
+
+def _set_sparse_paths(repo, sparse_paths):
+    """Limits the working tree to the given directories, or restores all of it if there are none."""
+    if sparse_paths:
+        repo.git.sparse_checkout("set", *sparse_paths)
+    # Read through git rather than config_reader, as sparse-checkout keeps it in the worktree config.
+    elif repo.git.config("core.sparseCheckout", bool=True, default="false") == "true":
+        repo.git.sparse_checkout("disable")
+
+def _fetch_git(url, branch, tag, cache_dir, depth=None, blobless=False, sparse_paths=None):
+    """
+    Clones a git repository, or updates the cached clone, and checks out the
+    tag or branch. Only what the scan of that one ref needs is transferred:
+    with a depth, history is cut to that many commits; blobless clones
+    (--filter=blob:none) download file contents only when they are checked
+    out or read; sparse_paths limits the checkout to those directories, plus
+    the files at the top level.
+
+    A cached clone is updated by fetching just the requested ref, with the
+    same depth, and checking out what was fetched. A blobless clone keeps its
+    filter for later fetches. Clones live under cache_dir/git, named after the
+    repository and a hash of the URL, so a/utils.git and b/utils.git get
+    clones of their own.
+    """
     repo_name = os.path.basename(urlparse(url).path).replace(".git", "")
-    repo_path = os.path.join(cache_dir, repo_name)
+    repo_path = os.path.join(cache_dir, "git", f"{repo_name}-{url_key(url)[:16]}")
+    ref = tag or branch
+    options = {"depth": depth} if depth else {}
     if os.path.exists(repo_path):
         print(f"Using cached repository at {repo_path}")
         repo = git.Repo(repo_path)
-        repo.remotes.origin.pull()
-    else:
-        print(f"Cloning repository from {url} to {repo_path}...")
-        repo = git.Repo.clone_from(url, repo_path, progress=tqdm)
-
-    if tag:
-        repo.git.checkout(tag)
-    elif branch:
-        repo.git.checkout(branch)
+        repo.git.fetch("origin", ref or "HEAD", no_tags=True, **options)
+        _set_sparse_paths(repo, sparse_paths)
+        if branch and not tag:
+            repo.git.checkout("-B", branch, "FETCH_HEAD", force=True)
+        else:
+            repo.git.checkout("FETCH_HEAD", force=True, detach=True)
+        return repo_path
 
+    print(f"Cloning repository from {url} to {repo_path}...")
+    if ref:
+        options["branch"] = ref
+    if blobless:
+        options["filter"] = "blob:none"
+    if sparse_paths:
+        options["sparse"] = True
+    repo = git.Repo.clone_from(url, repo_path, progress=_CloneProgress(), **options)
+    if sparse_paths:
+        _set_sparse_paths(repo, sparse_paths)
     return repo_path
 
 def _find_license(directory):
@@ -99,6 +246,47 @@ def _find_license(directory):
                 return f.read()
     return None
 
+def resolve_source(source_url, args, session=None, evict=True):
+    """
+    Fetches a git repository or archive without asking for license
+    confirmation. Returns the local path to scan and the license text, if any.
+    With evict, least recently used archives other than this one are evicted
+    from the cache afterwards; callers fetching several targets before
+    scanning them pass False and evict once all scans are done, so no target
+    is removed before it is scanned.
+    """
+    if args.source_type == "git" or source_url.endswith(".git"):
+        repo_path = _fetch_git(source_url, args.branch, args.tag, args.cache_dir, getattr(args, "git_depth", None),
+                               getattr(args, "blobless", False), getattr(args, "sparse", None))
+        return repo_path, _find_license(repo_path)
+
+    elif args.source_type == "archive" or source_url.endswith((".zip", ".tar.gz", ".tgz")):
+        cache = ArtifactCache(args.cache_dir, getattr(args, "max_cache_size", None) or DEFAULT_MAX_CACHE_SIZE_MB)
+        digest = cache.lookup(source_url, args.verify_checksum)
+        if digest is None:
+            download_path = cache.download_path(source_url)
+            chunk_size = getattr(args, "chunk_size", None)
+            downloaded_digest = _download_archive(source_url, download_path, args.max_download_size, args.timeout,
+                                                  args.verify_checksum, session=session,
+                                                  chunk_size=chunk_size * 1024 if chunk_size else DEFAULT_CHUNK_SIZE)
+            digest = cache.store(source_url, downloaded_digest, download_path)
+        else:
+            print(f"Using cached archive for {source_url}")
+
+        archive_path = cache.archive_path(digest)
+        if getattr(args, "scan_archives", False):
+            # The archive is scanned member by member, so nothing is extracted to disk.
+            target_path, license_text = archive_path, find_license_in_archive(archive_path)
+        else:
+            target_path = cache.extract(digest, _extract_archive)
+            license_text = _find_license(target_path)
+        if evict:
+            cache.evict(keep=[digest])
+        return target_path, license_text
+
+    else:
+        raise ValueError(f"Unsupported source type for URL: {source_url}")
+
 def fetch_source(args):
     """Fetches the source code from a remote location."""
     os.makedirs(args.cache_dir, exist_ok=True)
@@ -113,24 +301,7 @@ def fetch_source(args):
             print(f"Would attempt to clone {source_url} and find a license.")
         return None
 
-    if args.source_type == "git" or source_url.endswith(".git"):
-        repo_path = _fetch_git(source_url, args.branch, args.tag, args.cache_dir)
-        license_text = _find_license(repo_path)
-        if args.verify_license:
-            confirm_license(license_text, force_confirmation=True)
-        return repo_path
-
-    elif args.source_type == "archive" or source_url.endswith((".zip", ".tar.gz", ".tgz")):
-        cache_path = _get_cache_path(source_url, args.cache_dir)
-        if not os.path.exists(cache_path):
-            _download_archive(source_url, cache_path, args.max_download_size, args.timeout, args.verify_checksum)
-
-        extract_dir = cache_path.rsplit(".", 1)[0]
-        _extract_archive(cache_path, extract_dir)
-        license_text = _find_license(extract_dir)
-        if args.verify_license:
-            confirm_license(license_text, force_confirmation=True)
-        return extract_dir
-
-    else:
-        raise ValueError(f"Unsupported source type for URL: {source_url}")
+    target_path, license_text = resolve_source(source_url, args)
+    if args.verify_license:
+        confirm_license(license_text, force_confirmation=True)
+    return target_path
@@ -0,0 +1,105 @@
+import sys
+import hashlib
+from collections.abc import Mapping
+
+# Hex digits of the SHA-256 kept to identify a secret across files.
+SECRET_HASH_LENGTH = 16
+# Quotes and whitespace around a secret are not part of it.
+SECRET_STRIP = " \t\r\n'\"`"
+SECRET_GROUP = "secret"
+
+_rule_infos = {}
+
+
+def rule_info(rule_id, rule_type, confidence):
+    """Returns the shared (id, type, confidence) tuple of a rule, so findings do not repeat the strings."""
+    key = (rule_id, rule_type, confidence)
+    info = _rule_infos.get(key)
+    if info is None:
+        info = _rule_infos[key] = tuple(sys.intern(value) if isinstance(value, str) else value for value in key)
+    return info
+
+
+def match_secret(match):
+    """
+    Returns the secret of a regex match: its `secret` group if the pattern
+    names one, else the last group that took part in the match, else the
+    whole match. For `api_key = "(\\w+)"` that is the key, not the assignment.
+    """
+    if SECRET_GROUP in match.re.groupindex and match.group(SECRET_GROUP) is not None:
+        return match.group(SECRET_GROUP)
+    for index in range(match.re.groups, 0, -1):
+        if match.group(index) is not None:
+            return match.group(index)
+    return match.group()
+
+
+def secret_hash(secret):
+    """
+    Returns a short hash of a secret (str or bytes), used to group identical
+    secrets. Surrounding quotes and whitespace are stripped first, so a secret
+    hashes the same however it was quoted.
+    """
+    if isinstance(secret, str):
+        secret = secret.encode("utf-8", errors="surrogateescape")
+    secret = secret.strip(SECRET_STRIP.encode("ascii"))
+    return hashlib.sha256(secret).hexdigest()[:SECRET_HASH_LENGTH]
+
+
+class Finding(Mapping):
+    """
+    A compact finding. Rule metadata is a shared tuple and the file path is
+    shared by every finding of the file, so a finding costs a few pointers
+    instead of a dict. It reads like the classic finding dict, so
+    finding["file"], dict(finding, commit=...) and json.dumps(finding,
+    default=dict) all work.
+
+    column and end_column are the 1-based span of the match in its line, end
+    exclusive, as in SARIF. secret_hash identifies the secret within the match
+    without storing it.
+    """
+
+    __slots__ = ("rule", "file", "line", "snippet", "column", "end_column", "secret_hash")
+
+    KEYS = ("id", "file", "line", "snippet", "type", "confidence", "column", "end_column", "secret_hash")
+    _RULE_KEYS = {"id": 0, "type": 1, "confidence": 2}
+
+    def __init__(self, rule, file, line, snippet, column=None, end_column=None, secret_hash=None):
+        self.rule = rule
+        self.file = file
+        self.line = line
+        self.snippet = snippet
+        self.column = column
+        self.end_column = end_column
+        self.secret_hash = secret_hash
+
+    @classmethod
+    def from_dict(cls, finding):
+        """Builds a Finding from a classic finding dict, such as one read back from the scan cache."""
+        return cls(rule_info(finding["id"], finding["type"], finding["confidence"]), sys.intern(finding["file"]),
+                   finding["line"], finding["snippet"], finding.get("column"), finding.get("end_column"),
+                   finding.get("secret_hash"))
+
+    def with_file(self, file):
+        """Returns the same finding reported under another file path."""
+        return Finding(self.rule, file, self.line, self.snippet, self.column, self.end_column, self.secret_hash)
+
+    def __getitem__(self, key):
+        index = self._RULE_KEYS.get(key)
+        if index is not None:
+            return self.rule[index]
+        if key in self.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __reduce__(self):
+        return (Finding, (self.rule, self.file, self.line, self.snippet, self.column, self.end_column, self.secret_hash))
+
+    def __repr__(self):
+        return f"Finding({dict(self)!r})"
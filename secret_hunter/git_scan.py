@@ -0,0 +1,136 @@
+import io
+import git
+from secret_hunter.rules import compile_rules, load_rules
+from secret_hunter.scanner import scan_lines
+from secret_hunter.triage import in_shard
+
+NULL_SHA = "0" * 40
+GITLINK_MODE = "160000"
+
+
+def _read_tokens(stream, chunk_size=65536):
+    """Yields the NUL-separated tokens of a `git log -z` output stream."""
+    pending = b""
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        pending += chunk
+        *tokens, pending = pending.split(b"\0")
+        for token in tokens:
+            yield token.decode("utf-8", errors="surrogateescape")
+    if pending:
+        yield pending.decode("utf-8", errors="surrogateescape")
+
+
+def iter_changed_blobs(repo, rev_args):
+    """
+    Yields (commit_sha, path, blob_sha) for every blob added or modified by the
+    commits selected by rev_args, as listed by the object database. Deleted
+    files and submodules are skipped. A merge commit reports the blobs that
+    differ from every parent (`--cc`), such as conflict resolutions; content
+    taken unchanged from one side is attributed to the merged commits.
+    """
+    process = repo.git.log(
+        *rev_args, "--raw", "--cc", "--no-abbrev", "--no-renames", "--root", "-z", "--format=%H",
+        as_process=True,
+    )
+    commit_sha = None
+    blob_sha = None
+    try:
+        for token in _read_tokens(process.proc.stdout):
+            token = token.lstrip("\n")
+            if not token:
+                continue
+            if blob_sha is not None:
+                if blob_sha != NULL_SHA:
+                    yield commit_sha, token, blob_sha
+                blob_sha = None
+            elif token.startswith(":"):
+                # ":old_mode new_mode old_sha new_sha status", or for a merge with n parents
+                # n colons, n + 1 modes and n + 1 shas, the result's last.
+                fields = token.lstrip(":").split(" ")
+                count = (len(fields) - 1) // 2
+                new_mode, new_sha = fields[count - 1], fields[2 * count - 1]
+                blob_sha = NULL_SHA if new_mode == GITLINK_MODE else new_sha
+            else:
+                commit_sha = token
+    finally:
+        process.proc.stdout.close()
+        process.wait()
+
+
+class _BlobReader(io.RawIOBase):
+    """Adapts an object database stream to the io interface so it can be read line by line."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def scan_blob(repo, blob_sha, rules):
+    """
+    Scans the content of a blob straight from the object database. The blob is
+    streamed from the packfiles by `git cat-file`, so it is never held in
+    memory as a whole.
+    """
+    stream = repo.odb.stream(bytes.fromhex(blob_sha))
+    lines = io.TextIOWrapper(io.BufferedReader(_BlobReader(stream)), encoding="utf-8", errors="ignore")
+    return scan_lines(lines, None, rules)
+
+
+def collect_blob_occurrences(repo, rev_args):
+    """Maps each unique blob sha to the (commit_sha, path) pairs that introduced it."""
+    occurrences = {}
+    seen = set()
+    for change in iter_changed_blobs(repo, rev_args):
+        if change in seen:
+            continue
+        seen.add(change)
+        commit_sha, path, blob_sha = change
+        occurrences.setdefault(blob_sha, []).append((commit_sha, path))
+    return occurrences
+
+
+def _scan_blob_occurrences(repo, occurrences, rules, shard=None):
+    """
+    Scans each unique blob once and yields its findings at every (commit, path)
+    it appears in. With a shard (i, N), only blobs whose sha falls in shard i
+    are scanned, so no blob is scanned by two shards.
+    """
+    for blob_sha, locations in occurrences.items():
+        if shard is not None and not in_shard(blob_sha, shard):
+            continue
+        blob_findings = scan_blob(repo, blob_sha, rules)
+        for commit_sha, path in locations:
+            for finding in blob_findings:
+                yield dict(finding, file=path, commit=commit_sha)
+
+
+def scan_git_range(repo_path, rev_range, rules_file, shard=None):
+    """
+    Scans only the blobs changed by the commits in a revision range such as
+    "main..feature", without checking anything out. Each finding carries the
+    sha of the commit that introduced the blob and the blob's path. Findings
+    are yielded as each blob is scanned.
+    """
+    rules = compile_rules(load_rules(rules_file))
+    repo = git.Repo(repo_path)
+    occurrences = collect_blob_occurrences(repo, [rev_range])
+    return _scan_blob_occurrences(repo, occurrences, rules, shard)
+
+
+def scan_git_history(repo_path, rules_file, shard=None):
+    """
+    Scans the full history of every branch and tag. Each unique blob is
+    scanned exactly once, however many commits and paths share it, and its
+    findings are yielded at every commit and path that introduced it.
+    """
+    rules = compile_rules(load_rules(rules_file))
+    repo = git.Repo(repo_path)
+    occurrences = collect_blob_occurrences(repo, ["--all"])
+    return _scan_blob_occurrences(repo, occurrences, rules, shard)
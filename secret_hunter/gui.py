@@ -1,11 +1,83 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox
+from concurrent.futures import ThreadPoolExecutor
 from secret_hunter.scanner import scan_directory
 from secret_hunter.remediation import generate_report
-from secret_hunter.fetcher import fetch_source
 from secret_hunter.auth_check import confirm_authorization
 from argparse import Namespace
 
+# How often the Tk main loop drains the queue of scan events, in milliseconds.
+POLL_INTERVAL_MS = 100
+
+
+class ScanJob:
+    """
+    Runs a fetch and scan on a background thread. The thread never touches Tk.
+    Instead it puts events on a thread-safe queue, which the GUI drains from
+    the main loop:
+
+    ("progress", files_done, files_total, bytes_done, bytes_total, findings)
+    ("finding", finding)
+    ("done", message), ("cancelled", message) or ("error", message), always last
+
+    cancel() stops the scan after the current file and still saves a partial
+    report.
+    """
+
+    def __init__(self, args, fetch=False):
+        self.args = args
+        self.fetch = fetch
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+        self.findings = 0
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+
+    def start(self):
+        self.future = self.executor.submit(self._run)
+        self.executor.shutdown(wait=False)
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _progress(self, files_done, files_total, bytes_done, bytes_total):
+        self.events.put(("progress", files_done, files_total, bytes_done, bytes_total, self.findings))
+
+    def _stream(self, findings):
+        for finding in findings:
+            self.findings += 1
+            self.events.put(("finding", finding))
+            yield finding
+
+    def _run(self):
+        args = self.args
+        try:
+            if self.fetch:
+                # Imported here so the GUI starts without loading git, requests and tqdm.
+                from secret_hunter.fetcher import fetch_source
+                target_path = fetch_source(args)
+                if not target_path:
+                    self.events.put(("error", "Failed to fetch source. Check the console for details."))
+                    return
+                if self.cancelled.is_set():
+                    self.events.put(("cancelled", "Scan cancelled before it started."))
+                    return
+            else:
+                target_path = args.target
+            findings = scan_directory(target_path, args.rules, args.whitelist, args.no_decompile, args.max_depth,
+                                      progress=self._progress, cancel=self.cancelled)
+            generate_report(self._stream(findings), args.output)
+            if self.cancelled.is_set():
+                self.events.put(("cancelled", f"Scan cancelled. Partial report with {self.findings} findings saved to {args.output}"))
+            else:
+                self.events.put(("done", f"Scan complete. {self.findings} findings. Report saved to {args.output}"))
+        except Exception as e:
+            self.events.put(("error", f"An error occurred: {e}"))
+
+
 class SecretHunterGUI:
     def __init__(self, master):
         self.master = master
@@ -41,6 +113,21 @@ class SecretHunterGUI:
         self.fetch_scan_button = tk.Button(self.controls_frame, text="Fetch & Scan", command=self.fetch_and_scan, state=tk.DISABLED)
         self.fetch_scan_button.pack()
 
+        # Progress and findings of the running scan
+        self.job = None
+        self.progress_frame = tk.Frame(master)
+        self.progress_frame.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.progress_label = tk.Label(self.progress_frame, text="")
+        self.progress_label.pack()
+        self.cancel_button = tk.Button(self.progress_frame, text="Cancel", command=self.cancel_scan, state=tk.DISABLED)
+        self.cancel_button.pack()
+        self.findings_scrollbar = tk.Scrollbar(self.progress_frame)
+        self.findings_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.findings_list = tk.Listbox(self.progress_frame, width=100, height=15, yscrollcommand=self.findings_scrollbar.set)
+        self.findings_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.findings_scrollbar.config(command=self.findings_list.yview)
+        master.protocol("WM_DELETE_WINDOW", self.close)
+
     def check_authorization(self):
         if self.auth_entry.get().strip() == "I AUTHORIZE":
             messagebox.showinfo("Authorized", "Authorization confirmed. You may now proceed.")
@@ -70,9 +157,7 @@ class SecretHunterGUI:
             return
 
         args = Namespace(target=target_path, rules="rules.yml", whitelist=None, no_decompile=False, max_depth=10, output="report.json")
-        findings = scan_directory(args.target, args.rules, args.whitelist, args.no_decompile, args.max_depth)
-        generate_report(findings, args.output)
-        messagebox.showinfo("Success", f"Scan complete. Report saved to {args.output}")
+        self.start_job(ScanJob(args))
 
     def fetch_and_scan(self):
         source_url = self.source_url_entry.get()
@@ -84,17 +169,64 @@ class SecretHunterGUI:
         if not messagebox.askokcancel("Confirm License Check", "The tool will now fetch the source and may prompt you in the console to confirm the license. Please check your terminal."):
             return
 
-        args = Namespace(source_url=source_url, source_type="auto", branch=None, tag=None, cache_dir=".cache", max_download_size=100, timeout=60, verify_license=True, rules="rules.yml", whitelist=None, no_decompile=False, max_depth=10, output="report.json")
-        try:
-            target_path = fetch_source(args)
-            if target_path:
-                findings = scan_directory(target_path, args.rules, args.whitelist, args.no_decompile, args.max_depth)
-                generate_report(findings, args.output)
-                messagebox.showinfo("Success", f"Scan complete. Report saved to {args.output}")
+        args = Namespace(source_url=source_url, source_type="auto", branch=None, tag=None, cache_dir=".cache", max_download_size=100, timeout=60, verify_license=True, dry_run=False, verify_checksum=None, rules="rules.yml", whitelist=None, no_decompile=False, max_depth=10, output="report.json")
+        self.start_job(ScanJob(args, fetch=True))
+
+    def start_job(self, job):
+        """Starts a scan in the background and polls its events from the main loop."""
+        self.findings_list.delete(0, tk.END)
+        self.progress_label.config(text="Fetching..." if job.fetch else "Scanning...")
+        self.scan_button.config(state=tk.DISABLED)
+        self.fetch_scan_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.job = job.start()
+        self.master.after(POLL_INTERVAL_MS, self.poll_job)
+
+    def cancel_scan(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.progress_label.config(text="Cancelling after the current file...")
+
+    def close(self):
+        # The scan thread keeps the process alive until it returns, so stop it first.
+        if self.job is not None:
+            self.job.cancel()
+        self.master.destroy()
+
+    def poll_job(self):
+        """Applies the events the background scan has queued since the last poll."""
+        while True:
+            try:
+                event = self.job.events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "finding":
+                finding = event[1]
+                self.findings_list.insert(tk.END, f"[{finding['confidence']}] {finding['type']}: {finding['file']}:{finding['line']}")
+            elif kind == "progress":
+                files_done, files_total, bytes_done, bytes_total, findings = event[1:]
+                self.progress_label.config(text=f"{files_done}/{files_total} files, "
+                                                f"{bytes_done / 1024 / 1024:.1f}/{bytes_total / 1024 / 1024:.1f} MB, "
+                                                f"{findings} findings")
             else:
-                messagebox.showerror("Error", "Failed to fetch source. Check the console for details.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {e}")
+                self.finish_job(kind, event[1])
+                return
+        self.master.after(POLL_INTERVAL_MS, self.poll_job)
+
+    def finish_job(self, kind, message):
+        self.job = None
+        self.progress_label.config(text=message)
+        self.scan_button.config(state=tk.NORMAL)
+        self.fetch_scan_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        if kind == "error":
+            messagebox.showerror("Error", message)
+        elif kind == "cancelled":
+            messagebox.showinfo("Cancelled", message)
+        else:
+            messagebox.showinfo("Success", message)
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,143 @@
+import os
+import time
+from argparse import Namespace
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from secret_hunter.artifact_cache import DEFAULT_MAX_CACHE_SIZE_MB, ArtifactCache, url_key
+from secret_hunter.auth_check import confirm_license
+from secret_hunter.fetcher import resolve_source
+from secret_hunter.scanner import scan_directory
+from secret_hunter.stats import ScanStats
+from secret_hunter.triage import build_excludes
+
+DEFAULT_MAX_CONNECTIONS = 8
+
+
+def read_manifest(manifest_path):
+    """
+    Reads a batch manifest: one source URL per line, optionally followed by
+    the expected SHA256 checksum. Blank lines and lines starting with # are
+    ignored. Returns a list of (url, checksum) pairs.
+    """
+    targets = []
+    with open(manifest_path, "r") as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            targets.append((fields[0], fields[1] if len(fields) > 1 else None))
+    return targets
+
+
+def _make_session(max_connections):
+    """Returns a requests.Session whose connection pool allows max_connections connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _scan_target(source_url, target_path, rules_file, whitelist_file, no_decompile, max_depth, scan_options,
+                 profile=False):
+    """
+    Scans one fetched target inside a worker process and tags its findings
+    with the source URL. Returns the findings and, when profiling, the
+    to_dict() of the target's ScanStats.
+    """
+    stats = ScanStats() if profile else None
+    findings = scan_directory(target_path, rules_file, whitelist_file, no_decompile, max_depth, stats=stats,
+                              **scan_options)
+    return [dict(finding, source=source_url) for finding in findings], stats.to_dict() if profile else None
+
+
+def run_batch(args, targets, stats=None):
+    """
+    Fetches and scans many targets concurrently, yielding findings as each
+    target's scan completes.
+
+    Each target is scanned with the scan options of a directory scan: the
+    whitelist, baseline and new_only, the target type and, with incremental,
+    a scan cache. Passing a ScanStats profiles every scan and adds the
+    workers' counters to it.
+
+    Downloads and clones run in a thread pool of at most args.max_connections
+    threads sharing one pooled HTTP session. Each completed target is scanned
+    in a process pool of at most args.jobs workers while the remaining
+    downloads continue. License confirmation happens in the calling thread,
+    one target at a time. A target that fails to fetch or scan is reported and
+    skipped, and a URL listed more than once is fetched and scanned once.
+
+    Cached archives are evicted once, after every scan has finished, as a
+    fetch evicting on its own could remove a target still waiting to be
+    scanned.
+    """
+    max_connections = max(1, getattr(args, "max_connections", None) or DEFAULT_MAX_CONNECTIONS)
+    jobs = args.jobs or os.cpu_count() or 1
+    max_file_size = getattr(args, "max_file_size", None)
+    scan_options = {
+        "archive_depth": args.archive_depth if getattr(args, "scan_archives", False) else 0,
+        "excludes": build_excludes(getattr(args, "exclude", None) or (), getattr(args, "exclude_from", None) or (),
+                                   not getattr(args, "no_default_excludes", False)),
+        "max_file_size": max_file_size * 1024 * 1024 if max_file_size else None,
+        "decompiler": getattr(args, "decompiler", "auto"),
+        "decompile_dir": os.path.join(args.cache_dir, "decompiled"),
+        "target_type": getattr(args, "type", None) or "auto",
+        "rules_cache_dir": args.cache_dir,
+        "baseline_file": getattr(args, "baseline", None),
+        "new_only": getattr(args, "new_only", False),
+    }
+    incremental = getattr(args, "incremental", False)
+    os.makedirs(args.cache_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    session = _make_session(max_connections)
+    with session, ThreadPoolExecutor(max_workers=max_connections) as fetch_pool, \
+            ProcessPoolExecutor(max_workers=jobs) as scan_pool:
+        pending = {}
+        seen = set()
+        for source_url, checksum in targets:
+            # A URL listed twice would be fetched into the same clone or partial download by two threads.
+            if source_url in seen:
+                print(f"Skipping duplicate target {source_url}")
+                continue
+            seen.add(source_url)
+            target_args = Namespace(**vars(args))
+            target_args.source_url = source_url
+            target_args.verify_checksum = checksum
+            future = fetch_pool.submit(resolve_source, source_url, target_args, session, False)
+            pending[future] = ("fetch", source_url)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, source_url = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error {'fetching' if stage == 'fetch' else 'scanning'} {source_url}: {e}")
+                    continue
+
+                if stage == "fetch":
+                    target_path, license_text = result
+                    if args.verify_license:
+                        confirm_license(license_text, force_confirmation=True)
+                    target_options = scan_options
+                    if incremental:
+                        # One scan cache per source, as targets are scanned side by side and SQLite
+                        # allows a single writer at a time.
+                        target_options = dict(scan_options, cache_path=os.path.join(
+                            args.cache_dir, "scan-cache", f"{url_key(source_url)}.sqlite3"))
+                    scan = scan_pool.submit(_scan_target, source_url, target_path, args.rules, args.whitelist,
+                                            args.no_decompile, args.max_depth, target_options, stats is not None)
+                    pending[scan] = ("scan", source_url)
+                else:
+                    findings, target_stats = result
+                    if target_stats is not None:
+                        stats.merge(target_stats)
+                    yield from findings
+
+    if stats is not None:
+        stats.wall_seconds += time.perf_counter() - start
+    ArtifactCache(args.cache_dir, getattr(args, "max_cache_size", None) or DEFAULT_MAX_CACHE_SIZE_MB).evict()
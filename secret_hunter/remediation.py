@@ -1,10 +1,239 @@
 import json
+from secret_hunter.findings import Finding
+from secret_hunter.stats import ScanStats
 
-def generate_report(findings, output_file):
-    """Generates a JSON report of the findings."""
-    report = {
-        "findings": findings
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_LEVELS = {"High": "error", "Medium": "warning", "Low": "note"}
+# Finding keys that SARIF results carry in their location or fingerprints rather than as properties.
+SARIF_LOCATION_KEYS = ("id", "file", "line", "snippet", "column", "end_column", "secret_hash")
+# Key of a result's secret hash in SARIF partialFingerprints.
+SARIF_SECRET_FINGERPRINT = "secretHash/v1"
+# Marks where the streamed array goes in a writer's document template.
+STREAMED_ITEMS = "__streamed_items__"
+
+
+class JsonReportWriter:
+    """
+    Writes the classic {"findings": [...]} report one finding at a time. The
+    output is byte-for-byte what json.dump(report, f, indent=2) produces, but
+    findings are never collected in memory. Only a counter and the set of
+    files per distinct secret are kept, to add a "secrets" section grouping
+    the secrets found more than once.
+    """
+
+    document = {"findings": STREAMED_ITEMS}
+    group_secrets = True
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+        # secret_hash -> [rule id, occurrences, set of files]
+        self.secrets = {}
+        before, self.after = json.dumps(self.document, indent=2).split(json.dumps(STREAMED_ITEMS))
+        last_line = before.rsplit("\n", 1)[-1]
+        self.key_indent = " " * (len(last_line) - len(last_line.lstrip()))
+        self.item_indent = self.key_indent + "  "
+        self.closing = "\n" + self.key_indent + "]"
+        self.f.write(before + "[")
+
+    def _format(self, finding):
+        return finding
+
+    def _format_summary(self, stats):
+        """Returns the keys added next to the streamed array: repeated secrets and scan stats."""
+        summary = {}
+        repeated = sorted((-group[1], secret, group) for secret, group in self.secrets.items() if group[1] > 1)
+        if repeated:
+            summary["secrets"] = [{"secret_hash": secret, "id": group[0], "count": group[1], "files": len(group[2])}
+                                  for _, secret, group in repeated]
+        if stats is not None:
+            summary["stats"] = stats
+        return summary
+
+    def _group(self, finding):
+        # Findings are not always ordered by file (batches, merged reports), so files are kept in a set.
+        secret = finding.get("secret_hash")
+        if secret is None:
+            return
+        group = self.secrets.get(secret)
+        if group is None:
+            self.secrets[secret] = [finding["id"], 1, {finding["file"]}]
+        else:
+            group[1] += 1
+            group[2].add(finding["file"])
+
+    def write(self, finding):
+        if self.group_secrets:
+            self._group(finding)
+        text = json.dumps(self._format(finding), indent=2, default=dict)
+        text = "\n".join(self.item_indent + line for line in text.splitlines())
+        self.f.write(("\n" if self.count == 0 else ",\n") + text)
+        self.count += 1
+
+    def close(self, stats=None):
+        self.f.write("]" if self.count == 0 else self.closing)
+        summary = self._format_summary(stats)
+        if summary:
+            # Written as further keys of the object that holds the array, at the same indentation.
+            text = json.dumps(summary, indent=2)
+            lines = text.splitlines()[1:-1]
+            self.f.write(",\n" + "\n".join(self.key_indent + line[2:] for line in lines))
+        self.f.write(self.after)
+
+
+class JsonlReportWriter:
+    """Writes one JSON finding per line and flushes it, so consumers can tail the report."""
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def write(self, finding):
+        self.f.write(json.dumps(finding, default=dict) + "\n")
+        self.f.flush()
+        self.count += 1
+
+    def close(self, stats=None):
+        if stats is not None:
+            self.f.write(json.dumps({"stats": stats}) + "\n")
+
+
+class SarifReportWriter(JsonReportWriter):
+    """
+    Writes a SARIF 2.1.0 log whose results are appended as findings arrive.
+    Repeated secrets share a partialFingerprints entry instead of a summary.
+    """
+
+    document = {
+        "$schema": SARIF_SCHEMA,
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {"driver": {"name": "secret-hunter", "informationUri": "https://github.com/NabinSharmaitgithub/secret-hunter"}},
+            "results": STREAMED_ITEMS,
+        }],
     }
+
+    group_secrets = False
+
+    def _format_summary(self, stats):
+        return {} if stats is None else {"properties": {"stats": stats}}
+
+    def _format(self, finding):
+        properties = {key: value for key, value in finding.items() if key not in SARIF_LOCATION_KEYS}
+        region = {"startLine": finding["line"]}
+        if finding.get("column") is not None:
+            region.update(startColumn=finding["column"], endColumn=finding["end_column"])
+        region["snippet"] = {"text": finding["snippet"]}
+        result = {
+            "ruleId": finding["id"],
+            "level": SARIF_LEVELS.get(finding.get("confidence"), "warning"),
+            "message": {"text": f"{finding.get('type', finding['id'])} found"},
+            "locations": [{
+                "physicalLocation": {
+                    "artifactLocation": {"uri": finding["file"]},
+                    "region": region,
+                },
+            }],
+        }
+        if finding.get("secret_hash"):
+            result["partialFingerprints"] = {SARIF_SECRET_FINGERPRINT: finding["secret_hash"]}
+        result["properties"] = properties
+        return result
+
+
+REPORT_WRITERS = {
+    "json": JsonReportWriter,
+    "jsonl": JsonlReportWriter,
+    "sarif": SarifReportWriter,
+}
+
+
+def _sarif_finding(result):
+    """Turns a result written by SarifReportWriter back into a finding dict."""
+    location = result["locations"][0]["physicalLocation"]
+    region = location.get("region", {})
+    values = {"id": result["ruleId"], "file": location["artifactLocation"]["uri"], "line": region.get("startLine"),
+              "snippet": region.get("snippet", {}).get("text")}
+    if "startColumn" in region:
+        values.update(column=region["startColumn"], end_column=region.get("endColumn"))
+    secret = result.get("partialFingerprints", {}).get(SARIF_SECRET_FINGERPRINT)
+    if secret:
+        values["secret_hash"] = secret
+    values.update(result.get("properties", {}))
+    finding = {key: values.pop(key) for key in Finding.KEYS if key in values}
+    finding.update(values)
+    return finding
+
+
+def read_report(report_file):
+    """
+    Reads a report in any of the REPORT_WRITERS formats. Returns its list of
+    findings, as dicts, and its stats section or None.
+    """
+    with open(report_file, "r") as f:
+        try:
+            report = json.load(f)
+        except ValueError:
+            report = None
+        if isinstance(report, dict) and "runs" in report:
+            findings = []
+            stats = None
+            for run in report["runs"]:
+                findings.extend(_sarif_finding(result) for result in run.get("results", []))
+                stats = run.get("properties", {}).get("stats", stats)
+            return findings, stats
+        if isinstance(report, dict) and "findings" in report:
+            return report["findings"], report.get("stats")
+        f.seek(0)
+        findings = []
+        stats = None
+        for line in f:
+            item = json.loads(line)
+            if "stats" in item and "id" not in item:
+                stats = item["stats"]
+            else:
+                findings.append(item)
+        return findings, stats
+
+
+def merge_reports(report_files):
+    """
+    Combines partial reports, such as those of the shards of one scan, into
+    the findings and stats of one report. Findings found by more than one
+    part are kept once, and findings are ordered by file and then by line.
+    The sort is stable and a shard scans every file it gets as a whole, so
+    merging the shards of a directory scan gives the findings in the order
+    of an unsharded scan.
+
+    Counters and times of the parts are summed, except wall time, which is
+    the longest of the parts, as shards run side by side. Returns the list of
+    findings and a ScanStats, or None if no part has stats.
+    """
+    findings = {}
+    stats = None
+    for report_file in report_files:
+        part_findings, part_stats = read_report(report_file)
+        for finding in part_findings:
+            findings.setdefault(json.dumps(finding, sort_keys=True), finding)
+        if part_stats is not None:
+            if stats is None:
+                stats = ScanStats()
+            stats.merge(part_stats)
+            stats.wall_seconds = max(stats.wall_seconds, part_stats.get("wall_seconds", 0.0))
+    return sorted(findings.values(), key=lambda finding: (finding["file"], finding["line"])), stats
+
+
+def generate_report(findings, output_file, report_format="json", stats=None):
+    """
+    Writes a report of the findings as they are produced. Findings can be any
+    iterable, such as the generator returned by scan_directory. A ScanStats
+    filled by that scan is written as a stats section once the findings are
+    exhausted.
+    """
     with open(output_file, "w") as f:
-        json.dump(report, f, indent=2)
+        writer = REPORT_WRITERS[report_format](f)
+        for finding in findings:
+            writer.write(finding)
+        writer.close(None if stats is None else stats.to_dict())
     print(f"Report generated at {output_file}")
+    return writer.count
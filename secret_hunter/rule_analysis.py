@@ -0,0 +1,304 @@
+import re
+from secret_hunter.entropy import CHARSETS
+
+try:
+    from re import _compiler as sre_compile, _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    import sre_compile
+    import sre_constants
+    import sre_parse
+
+# Required literals shorter than this are too common to be worth a substring
+# check before the regex runs.
+MIN_LITERAL_LENGTH = 3
+# Estimated cost above which a rule is reported as expensive and only ever
+# sees MAX_GUARDED_LENGTH characters at a time. Every rule is matched that way
+# on lines longer than MAX_GUARDED_LENGTH, so backtracking the estimate
+# misses stays bounded too.
+MAX_RULE_COST = 1000
+MAX_GUARDED_LENGTH = 4096
+GUARD_OVERLAP = 256
+# Cost weight of an unbounded repeat (`*`, `+`, `{n,}`).
+UNBOUNDED_REPEAT_COST = 100
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+_SINGLE_CHARACTERS = {sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN}
+_ZERO_WIDTH = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+# Characters tried when working out what an alternative can start with.
+_ALPHABET = frozenset(chr(code) for code in range(128))
+# Possessive repeats and atomic groups never backtrack (Python 3.11+).
+_POSSESSIVE = getattr(sre_constants, "POSSESSIVE_REPEAT", None)
+_ATOMIC = getattr(sre_constants, "ATOMIC_GROUP", None)
+
+
+def _width(state, item):
+    """Returns the (min, max) width of a single parsed item."""
+    return sre_parse.SubPattern(state, [item]).getwidth()
+
+
+def _required_literals(items, ignorecase, run, literals):
+    """Collects the runs of literal characters every match of the items contains."""
+    def flush():
+        if run:
+            literals.append("".join(run))
+            del run[:]
+
+    for op, av in items:
+        if op is sre_constants.LITERAL and not ignorecase:
+            run.append(chr(av))
+        elif op is sre_constants.AT:
+            continue
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            sub_ignorecase = (ignorecase or add_flags & sre_constants.SRE_FLAG_IGNORECASE) \
+                and not del_flags & sre_constants.SRE_FLAG_IGNORECASE
+            _required_literals(sub, sub_ignorecase, run, literals)
+        elif op is _ATOMIC:
+            _required_literals(av, ignorecase, run, literals)
+        elif op in _REPEATS or op is _POSSESSIVE:
+            low, high, sub = av
+            if low == high == 1:
+                _required_literals(sub, ignorecase, run, literals)
+                continue
+            flush()
+            if low >= 1:
+                _required_literals(sub, ignorecase, run, literals)
+                flush()
+        else:
+            flush()
+    flush()
+
+
+def _cost(items):
+    """Estimates the matching steps per start position: sequences add and repeats multiply."""
+    cost = 0
+    for op, av in items:
+        if op is sre_constants.AT:
+            continue
+        if op is sre_constants.SUBPATTERN:
+            cost += _cost(av[-1])
+        elif op is _ATOMIC:
+            cost += _cost(av)
+        elif op is sre_constants.BRANCH:
+            cost += sum(_cost(branch) for branch in av[1])
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            cost += _cost(av[1])
+        elif op is sre_constants.GROUPREF_EXISTS:
+            cost += _cost(av[1]) + (_cost(av[2]) if av[2] else 0)
+        elif op in _REPEATS or op is _POSSESSIVE:
+            low, high, sub = av
+            span = UNBOUNDED_REPEAT_COST if high == sre_constants.MAXREPEAT else high
+            cost += _cost(sub) * max(span, 1)
+        else:
+            cost += 1
+    return cost
+
+
+def _exposed_variable_repeat(items):
+    """
+    Returns True if the only part of the items that must consume input is a
+    variable-length repeat, as in `a+` or `\\w+\\s?`. Repeating such a body
+    gives the engine many ways to split the same text.
+    """
+    mandatory = [item for item in items if _width(items.state, item)[0] > 0]
+    if len(mandatory) != 1:
+        return False
+    op, av = mandatory[0]
+    if op in _REPEATS:
+        return av[0] != av[1]
+    if op is sre_constants.SUBPATTERN:
+        return _exposed_variable_repeat(av[-1])
+    return False
+
+
+def _first_characters(items):
+    """
+    Returns the ASCII characters a match of the items can start with. Items
+    that can match the empty string could be followed by anything, so they can
+    start with any character.
+    """
+    characters = set()
+    for item in items:
+        op, av = item
+        if op in _ZERO_WIDTH:
+            continue
+        if op is sre_constants.SUBPATTERN:
+            characters |= _first_characters(av[-1])
+        elif op is _ATOMIC:
+            characters |= _first_characters(av)
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                characters |= _first_characters(branch)
+        elif op in _REPEATS or op is _POSSESSIVE:
+            characters |= _first_characters(av[2])
+        elif op in _SINGLE_CHARACTERS:
+            pattern = sre_compile.compile(sre_parse.SubPattern(items.state, [item]))
+            characters |= {character for character in _ALPHABET if pattern.match(character)}
+        else:
+            return set(_ALPHABET)
+        if _width(items.state, item)[0] > 0:
+            return characters
+    return set(_ALPHABET)
+
+
+def _overlapping_branch(items):
+    """
+    Returns True if the items contain an alternation whose branches can start
+    with the same character, as in `(?:a|aa)` or `(a|a)`. Repeating such a body
+    gives the engine a choice at every step that later steps can make up for.
+    """
+    for op, av in items:
+        if op is sre_constants.SUBPATTERN:
+            if _overlapping_branch(av[-1]):
+                return True
+        elif op is sre_constants.BRANCH:
+            seen = set()
+            for branch in av[1]:
+                first = _first_characters(branch)
+                if seen & first:
+                    return True
+                seen |= first
+    return False
+
+
+def _nested_quantifier(items):
+    """
+    Returns True if an unbounded repeat wraps an ambiguous body, e.g. `(a+)+`,
+    `(\\w+\\s?)*` or `(?:a|aa)+`.
+    """
+    for op, av in items:
+        if op is sre_constants.SUBPATTERN:
+            if _nested_quantifier(av[-1]):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_nested_quantifier(branch) for branch in av[1]):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _nested_quantifier(av[1]):
+                return True
+        elif op in _REPEATS:
+            low, high, sub = av
+            if high == sre_constants.MAXREPEAT and (sub.getwidth()[0] == 0 or _exposed_variable_repeat(sub)
+                                                    or _overlapping_branch(sub)):
+                return True
+            if _nested_quantifier(sub):
+                return True
+    return False
+
+
+class RegexAnalysis:
+    """
+    What can be known about a pattern before running it: the literal
+    substrings every match contains, an estimate of its matching cost, and
+    whether it nests quantifiers in a way that backtracks exponentially.
+    """
+
+    __slots__ = ("literals", "cost", "nested_quantifier")
+
+    def __init__(self, regex):
+        parsed = sre_parse.parse(regex)
+        self.literals = []
+        if not parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+            _required_literals(parsed, False, [], self.literals)
+        self.cost = _cost(parsed)
+        self.nested_quantifier = _nested_quantifier(parsed)
+
+    @classmethod
+    def from_list(cls, values):
+        """Restores an analysis serialized with to_list, without parsing the pattern again."""
+        analysis = cls.__new__(cls)
+        analysis.literals, analysis.cost, analysis.nested_quantifier = values
+        return analysis
+
+    def to_list(self):
+        return [self.literals, self.cost, self.nested_quantifier]
+
+    @property
+    def literal(self):
+        """The longest required literal, or an empty string if none is long enough to filter on."""
+        longest = max(self.literals, key=len, default="")
+        return longest if len(longest) >= MIN_LITERAL_LENGTH else ""
+
+    @property
+    def expensive(self):
+        return self.cost > MAX_RULE_COST
+
+
+_analyses = {}
+
+
+def analyze(regex):
+    """Returns the RegexAnalysis of a pattern, analyzing each pattern once per process."""
+    analysis = _analyses.get(regex)
+    if analysis is None:
+        analysis = _analyses[regex] = RegexAnalysis(regex)
+    return analysis
+
+
+def export_analyses(regexes):
+    """Returns the analyses of the patterns in a JSON-serializable form."""
+    return {regex: analyze(regex).to_list() for regex in regexes}
+
+
+def import_analyses(analyses):
+    """Primes the per-process analysis cache with the output of export_analyses."""
+    for regex, values in analyses.items():
+        _analyses.setdefault(regex, RegexAnalysis.from_list(values))
+
+
+def required_literal(regex):
+    """Returns the longest literal substring every match of the pattern must contain."""
+    return analyze(regex).literal
+
+
+def rule_problems(rule):
+    """Returns the reasons a rule cannot be loaded, or an empty list if it is valid."""
+    if not isinstance(rule, dict):
+        return ["not a mapping"]
+    problems = [f"missing '{key}'" for key in ("id", "type", "confidence") if key not in rule]
+    if ("regex" in rule) == ("entropy" in rule):
+        problems.append("needs exactly one of 'regex' and 'entropy'")
+    elif "entropy" in rule:
+        options = rule["entropy"] or {}
+        try:
+            float(options["threshold"])
+            int(options.get("min_length", 20))
+        except (KeyError, TypeError, ValueError):
+            problems.append("entropy needs a numeric 'threshold' and an integer 'min_length'")
+        if options.get("charset", "base64") not in CHARSETS:
+            problems.append(f"unknown entropy charset {options.get('charset')!r}")
+    else:
+        try:
+            re.compile(rule["regex"])
+        except (re.error, TypeError) as e:
+            problems.append(f"invalid regex: {e}")
+        else:
+            if analyze(rule["regex"]).nested_quantifier:
+                problems.append("nested quantifiers or overlapping alternatives can backtrack catastrophically")
+    return problems
+
+
+def check_rules(rules):
+    """
+    Validates rules at load time. Invalid rules, duplicates and patterns with
+    nested quantifiers are reported and dropped; expensive patterns are
+    reported and kept, and are matched under the line-length guard.
+    """
+    valid = []
+    seen = set()
+    for position, rule in enumerate(rules, 1):
+        name = rule.get("id", f"#{position}") if isinstance(rule, dict) else f"#{position}"
+        problems = rule_problems(rule)
+        if not problems and rule["id"] in seen:
+            problems = ["duplicate id"]
+        if problems:
+            print(f"Error in rule {name}, skipping it: {'; '.join(problems)}")
+            continue
+        seen.add(rule["id"])
+        if "regex" in rule:
+            analysis = analyze(rule["regex"])
+            if analysis.expensive:
+                print(f"Warning: rule {name} has an estimated cost of {analysis.cost}; "
+                      f"it is matched {MAX_GUARDED_LENGTH} characters at a time on longer lines.")
+        valid.append(rule)
+    return valid
@@ -0,0 +1,416 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+from secret_hunter.entropy import (candidate_regex, effective_min_length, has_high_entropy_token, is_high_entropy,
+                                   token_regex)
+from secret_hunter.findings import rule_info
+from secret_hunter.rule_analysis import GUARD_OVERLAP, MAX_GUARDED_LENGTH, analyze, check_rules, export_analyses, import_analyses
+from secret_hunter.stats import COMBINED_PREFILTER, ENTROPY_TOKENS
+
+_META_CHARS = ".^$*+?{}[]()|"
+_QUANTIFIERS = "*+?{"
+_GLOBAL_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+_NAMED_GROUP = re.compile(r"(?<!\\)\(\?P<\w+>")
+# Bump whenever the serialized form of loaded rules or their validation changes so stale files are ignored.
+RULES_CACHE_VERSION = 2
+
+
+def _rules_cache_path(rules_file, cache_dir):
+    """Returns where the serialized rules of this exact version of the rules file are kept."""
+    stat = os.stat(rules_file)
+    key = json.dumps([RULES_CACHE_VERSION, list(sys.version_info[:2]), os.path.realpath(rules_file),
+                      stat.st_size, stat.st_mtime_ns])
+    return os.path.join(cache_dir, "rules", hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+
+def load_rules(rules_file, cache_dir=None):
+    """
+    Loads the list of rules from a YAML rules file, dropping the ones that fail
+    validation. With a cache_dir, the validated rules and the analysis of
+    their patterns are stored as JSON keyed by the file's path, size and
+    mtime, so later runs skip both the yaml import and the analysis.
+    """
+    cache_path = _rules_cache_path(rules_file, cache_dir) if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+            import_analyses(cached["analyses"])
+            return cached["rules"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    # Imported here so runs with a warm rules cache never load yaml.
+    import yaml
+    with open(rules_file, "r") as f:
+        rules = check_rules(yaml.safe_load(f)["rules"])
+    if cache_path:
+        regexes = [rule.regex for rule in RuleSet(rules)]
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"rules": rules, "analyses": export_analyses(regexes)}, f)
+        os.replace(temp_path, cache_path)
+    return rules
+
+
+def _has_top_level_alternation(regex):
+    """Returns True if the pattern contains a `|` outside of any group or class."""
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(regex):
+        char = regex[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            if char == "]":
+                in_class = False
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def literal_prefix(regex):
+    """
+    Extracts the literal text every match of the pattern must start with,
+    e.g. "AKIA" for "AKIA[0-9A-Z]{16}". Returns an empty string if there is none.
+    """
+    if _has_top_level_alternation(regex):
+        return ""
+    prefix = []
+    i = 0
+    while i < len(regex):
+        char = regex[i]
+        if char == "\\":
+            if i + 1 >= len(regex) or regex[i + 1].isalnum():
+                break
+            char = regex[i + 1]
+            step = 2
+        elif char in _META_CHARS:
+            if char in _QUANTIFIERS and prefix:
+                prefix.pop()
+            break
+        else:
+            step = 1
+        if i + step < len(regex) and regex[i + step] in _QUANTIFIERS:
+            break
+        prefix.append(char)
+        i += step
+    return "".join(prefix)
+
+
+def _compile_bytes(regex):
+    """
+    Compiles a pattern for matching raw bytes, or returns None if it only works
+    on text. Buffers hold many lines, so ^ and $ match at every line boundary,
+    as they do when the pattern is run on a single line.
+    """
+    try:
+        return re.compile(regex.encode("utf-8"), re.MULTILINE)
+    except re.error:
+        return None
+
+
+class GuardedPattern:
+    """
+    Wraps a compiled pattern so it never runs on more than MAX_GUARDED_LENGTH
+    characters at once. Longer text is matched in overlapping segments, which
+    bounds the backtracking of a pattern on one huge line: a polynomial
+    pattern costs at most its price on one segment per segment. Segments
+    that lack the rule's required literal are skipped without running the
+    pattern. A match that reaches a cut segment end, where $ and word
+    boundaries would see a false end of text, is checked again with the text
+    that follows. Matches longer than the overlap that cross a segment
+    boundary can be missed.
+    """
+
+    __slots__ = ("pattern", "literal")
+
+    def __init__(self, pattern, literal=None):
+        self.pattern = pattern
+        self.literal = literal
+
+    def finditer(self, string, pos=0, endpos=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        if endpos - pos <= MAX_GUARDED_LENGTH:
+            yield from self.pattern.finditer(string, pos, endpos)
+            return
+        step = MAX_GUARDED_LENGTH - GUARD_OVERLAP
+        for start in range(pos, endpos, step):
+            end = min(endpos, start + MAX_GUARDED_LENGTH)
+            if not self.literal or string.find(self.literal, start, end) != -1:
+                for match in self.pattern.finditer(string, start, end):
+                    # Later segments report the matches that start in the overlap.
+                    if match.start() >= start + step and end < endpos:
+                        break
+                    if match.end() == end < endpos:
+                        match = self.pattern.match(string, match.start(), min(endpos, match.start() + MAX_GUARDED_LENGTH))
+                        if match is None:
+                            continue
+                    yield match
+            if end == endpos:
+                break
+
+    def search(self, string, pos=0, endpos=None):
+        return next(self.finditer(string, pos, endpos), None)
+
+    def findall(self, string, pos=0, endpos=None):
+        return [match.group() for match in self.finditer(string, pos, endpos)]
+
+
+class CompiledRule:
+    """
+    A single rule with its pattern compiled and its literal prefilter extracted.
+    The prefilter is the longest literal substring every match must contain,
+    not only a literal prefix. Patterns estimated to be expensive are wrapped
+    in a GuardedPattern. Every other pattern also has a guarded form,
+    long_pattern (long_byte_pattern for bytes), used on lines longer than
+    MAX_GUARDED_LENGTH, as a cheap estimate does not rule out polynomial
+    backtracking such as `[a-z]+@[a-z]+\\.com` on a long run of letters.
+
+    Entropy rules have no regex of their own. Their pattern finds candidate
+    tokens of the rule's charset, and a token only matches if its Shannon
+    entropy reaches the rule's threshold.
+    """
+
+    __slots__ = ("index", "id", "type", "confidence", "info", "regex", "pattern", "literal", "cost", "guarded",
+                 "byte_pattern", "byte_literal", "long_pattern", "long_byte_pattern", "entropy", "charset",
+                 "min_length", "rule")
+
+    def __init__(self, index, rule):
+        self.index = index
+        self.id = rule["id"]
+        self.type = rule["type"]
+        self.confidence = rule["confidence"]
+        self.info = rule_info(self.id, self.type, self.confidence)
+        self.entropy = None
+        self.charset = None
+        self.min_length = 0
+        if "entropy" in rule:
+            options = rule["entropy"]
+            self.entropy = float(options["threshold"])
+            self.charset = options.get("charset", "base64")
+            self.min_length = effective_min_length(options.get("min_length", 20), self.entropy)
+            self.regex = token_regex(self.charset, self.min_length)
+        else:
+            self.regex = rule["regex"]
+        analysis = analyze(self.regex)
+        self.cost = analysis.cost
+        self.guarded = analysis.expensive and self.entropy is None
+        self.literal = analysis.literal
+        self.byte_literal = self.literal.encode("utf-8")
+        self.pattern = re.compile(self.regex)
+        self.byte_pattern = _compile_bytes(self.regex)
+        if self.entropy is not None:
+            # Token patterns run in linear time, and segments would cut long tokens.
+            self.long_pattern, self.long_byte_pattern = self.pattern, self.byte_pattern
+        else:
+            self.long_pattern = GuardedPattern(self.pattern, self.literal)
+            self.long_byte_pattern = None if self.byte_pattern is None else GuardedPattern(self.byte_pattern,
+                                                                                          self.byte_literal)
+        if self.guarded:
+            self.pattern, self.byte_pattern = self.long_pattern, self.long_byte_pattern
+        self.rule = rule
+
+    def _pattern_for(self, text):
+        """Returns the pattern to run on the text (str or bytes), guarded if the text is long."""
+        if len(text) > MAX_GUARDED_LENGTH:
+            return self.long_pattern if isinstance(text, str) else self.long_byte_pattern
+        return self.pattern if isinstance(text, str) else self.byte_pattern
+
+    def search(self, text):
+        """Returns True if the rule matches anywhere in the text (str or bytes)."""
+        pattern = self._pattern_for(text)
+        if self.entropy is not None:
+            return has_high_entropy_token(pattern, text, self.entropy)
+        return pattern.search(text) is not None
+
+    def find(self, text):
+        """Returns the rule's first match in the text, or None."""
+        pattern = self._pattern_for(text)
+        if self.entropy is not None:
+            for match in pattern.finditer(text):
+                if is_high_entropy(match.group(), self.entropy):
+                    return match
+            return None
+        return pattern.search(text)
+
+    def span(self, text):
+        """Returns the (start, end) of the rule's first match in the text, or None."""
+        match = self.find(text)
+        return None if match is None else match.span()
+
+
+class RuleSet:
+    """
+    Compiles a list of rules once into a combined matcher.
+
+    Rules with a required literal are only evaluated on lines that contain
+    the literal, which is a plain substring check. The remaining rules are
+    placed in a single alternation of named groups, so a line that matches
+    none of them is rejected with one regex pass. Rules with literals are kept
+    out of the alternation because it would hide the literal from the regex
+    engine's own fast literal search, and guarded rules because the
+    alternation would run them unguarded. Both matchers are also compiled for
+    bytes so large files can be scanned without decoding them.
+
+    Entropy rules share one candidate-token pattern, so each line is split
+    into tokens once however many entropy rules there are.
+
+    Lines longer than MAX_GUARDED_LENGTH skip the alternation and are
+    matched by each rule's guarded pattern, so no line is ever matched
+    unguarded whatever its length. For the same reason the byte alternation,
+    which runs over whole windows of a memory map, is guarded too.
+    """
+
+    def __init__(self, rules):
+        self.rules = [CompiledRule(index, rule) for index, rule in enumerate(rules)]
+        self.bytes_compatible = all(rule.byte_pattern is not None for rule in self.rules)
+        self.combined = None
+        self.combined_bytes = None
+        self.combined_rules = []
+
+        residual = [
+            rule for rule in self.rules
+            if not rule.literal and rule.entropy is None and not rule.guarded
+            and not _GLOBAL_FLAGS.match(rule.regex) and not _BACKREFERENCE.search(rule.regex)
+        ]
+        if len(residual) > 1:
+            # Group names of the rules, such as `secret`, would clash in one pattern.
+            alternation = "|".join(f"(?P<r{rule.index}>{_NAMED_GROUP.sub('(?:', rule.regex)})" for rule in residual)
+            try:
+                self.combined = re.compile(alternation)
+            except re.error:
+                pass
+            else:
+                self.combined_rules = residual
+                if self.bytes_compatible:
+                    self.combined_bytes = GuardedPattern(_compile_bytes(alternation))
+        self._in_combined = {rule.index for rule in self.combined_rules}
+
+        self.entropy_rules = [rule for rule in self.rules if rule.entropy is not None]
+        self.candidates = None
+        if self.entropy_rules:
+            self.candidates = re.compile(candidate_regex(
+                [rule.charset for rule in self.entropy_rules],
+                min(rule.min_length for rule in self.entropy_rules),
+            ))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def in_combined(self, rule):
+        """Returns True if the rule is only evaluated after the combined alternation matched."""
+        return rule.index in self._in_combined
+
+    def match(self, line):
+        """Returns the rules that match the line, in rule order."""
+        if len(line) > MAX_GUARDED_LENGTH:
+            return [rule for rule in self.rules if rule.search(line)]
+        first = -1
+        combined_hit = False
+        if self.combined is not None:
+            hit = self.combined.search(line)
+            if hit is not None:
+                combined_hit = True
+                name = hit.lastgroup or ""
+                first = int(name[1:]) if name[1:].isdigit() else -1
+
+        tokens = self.candidates.findall(line) if self.candidates is not None else ()
+
+        matched = []
+        in_combined = self._in_combined
+        for rule in self.rules:
+            if rule.literal:
+                if rule.literal in line and rule.pattern.search(line):
+                    matched.append(rule)
+            elif rule.index in in_combined:
+                if combined_hit and (rule.index == first or rule.pattern.search(line)):
+                    matched.append(rule)
+            elif rule.entropy is not None:
+                if any(has_high_entropy_token(rule.pattern, token, rule.entropy) for token in tokens):
+                    matched.append(rule)
+            elif rule.pattern.search(line):
+                matched.append(rule)
+        return matched
+
+    def profiled_match(self, line, stats):
+        """
+        Same as match, but charges the time of every step to a ScanStats: the
+        combined alternation and the entropy tokenizer to their pseudo rules,
+        and each rule's own check to its id. Kept apart from match so the
+        unprofiled hot path pays nothing for it.
+        """
+        clock = time.perf_counter
+        line_start = clock()
+        if len(line) > MAX_GUARDED_LENGTH:
+            matched = []
+            for rule in self.rules:
+                start = clock()
+                hit = rule.search(line)
+                stats.add_rule(rule.id, clock() - start, hit)
+                if hit:
+                    matched.append(rule)
+            stats.match_seconds += clock() - line_start
+            return matched
+        first = -1
+        combined_hit = False
+        if self.combined is not None:
+            start = clock()
+            hit = self.combined.search(line)
+            stats.add_rule(COMBINED_PREFILTER, clock() - start, hit is not None)
+            if hit is not None:
+                combined_hit = True
+                name = hit.lastgroup or ""
+                first = int(name[1:]) if name[1:].isdigit() else -1
+
+        tokens = ()
+        if self.candidates is not None:
+            start = clock()
+            tokens = self.candidates.findall(line)
+            stats.add_rule(ENTROPY_TOKENS, clock() - start)
+
+        matched = []
+        in_combined = self._in_combined
+        for rule in self.rules:
+            start = clock()
+            if rule.literal:
+                hit = rule.literal in line and rule.pattern.search(line) is not None
+            elif rule.index in in_combined:
+                hit = combined_hit and (rule.index == first or rule.pattern.search(line) is not None)
+            elif rule.entropy is not None:
+                hit = any(has_high_entropy_token(rule.pattern, token, rule.entropy) for token in tokens)
+            else:
+                hit = rule.pattern.search(line) is not None
+            stats.add_rule(rule.id, clock() - start, hit)
+            if hit:
+                matched.append(rule)
+        stats.match_seconds += clock() - line_start
+        return matched
+
+    def match_ids(self, line):
+        """Returns the ids of the rules that match the line."""
+        return [rule.id for rule in self.match(line)]
+
+
+def compile_rules(rules):
+    """Compiles a list of rule dicts into a RuleSet. RuleSets are returned as-is."""
+    if isinstance(rules, RuleSet):
+        return rules
+    return RuleSet(rules)
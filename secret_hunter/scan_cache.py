@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+import sqlite3
+from secret_hunter.findings import Finding
+
+# Bump whenever the shape of a finding, or how its fields are worked out, changes so stale entries are ignored.
+CACHE_VERSION = 6
+
+
+def rule_fingerprint(rule, options=None):
+    """Returns a stable hash of a rule definition and the scan options it runs with."""
+    payload = json.dumps([CACHE_VERSION, options or {}, rule], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(filepath, chunk_size=1024 * 1024):
+    """Returns the SHA-256 of a file's content."""
+    hasher = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class CacheEntry:
+    """The cache state of one file: findings already known and rules still to run."""
+
+    __slots__ = ("filepath", "size", "mtime_ns", "digest", "cached", "missing")
+
+    def __init__(self, filepath, size, mtime_ns, digest, cached, missing):
+        self.filepath = filepath
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        self.cached = cached
+        self.missing = missing
+
+    def findings(self):
+        """Returns the known findings ordered by line and then by rule."""
+        return [finding for _, _, finding in sorted(self.cached, key=lambda item: item[:2])]
+
+
+class ScanCache:
+    """
+    A persistent per-file result cache stored in SQLite.
+
+    Files are identified by path, size and mtime, falling back to a content
+    hash when the stat information changed. Findings are stored per content
+    hash and per rule fingerprint, so editing one rule only invalidates the
+    results of that rule and unchanged files are never read again.
+    """
+
+    def __init__(self, cache_path, rules, options=None):
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.rules = rules
+        self.fingerprints = [rule_fingerprint(rule, options) for rule in rules]
+        self.ruleset_hash = hashlib.sha256("".join(self.fingerprints).encode("utf-8")).hexdigest()
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                digest TEXT, rule TEXT, findings TEXT, PRIMARY KEY (digest, rule)
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        self._drop_stale_rules()
+
+    def _drop_stale_rules(self):
+        """Removes results of rules that are no longer part of the rule set."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'ruleset'").fetchone()
+        if row and row[0] == self.ruleset_hash:
+            return
+        placeholders = ",".join("?" * len(self.fingerprints))
+        self.conn.execute(f"DELETE FROM results WHERE rule NOT IN ({placeholders})", self.fingerprints)
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('ruleset', ?)", (self.ruleset_hash,))
+        self.conn.commit()
+
+    def lookup(self, filepath):
+        """Returns a CacheEntry describing what is already known about the file."""
+        stat = os.stat(filepath)
+        row = self.conn.execute("SELECT size, mtime_ns, digest FROM files WHERE path = ?", (filepath,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            digest = row[2]
+        else:
+            digest = file_digest(filepath)
+
+        stored = dict(self.conn.execute("SELECT rule, findings FROM results WHERE digest = ?", (digest,)))
+        cached = []
+        missing = []
+        for index, fingerprint in enumerate(self.fingerprints):
+            if fingerprint not in stored:
+                missing.append(index)
+                continue
+            for finding in json.loads(stored[fingerprint]):
+                finding["file"] = filepath + finding["file"]
+                cached.append((finding["line"], index, Finding.from_dict(finding)))
+
+        entry = CacheEntry(filepath, stat.st_size, stat.st_mtime_ns, digest, cached, missing)
+        if not missing and (not row or row[2] != digest or row[1] != stat.st_mtime_ns):
+            self._store_file(entry)
+        return entry
+
+    def _store_file(self, entry):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            (entry.filepath, entry.size, entry.mtime_ns, entry.digest),
+        )
+
+    def store(self, entry, findings):
+        """Stores the findings of the entry's missing rules and returns all of its findings in order."""
+        index_by_id = {}
+        for index in entry.missing:
+            index_by_id.setdefault(self.rules[index]["id"], index)
+
+        per_rule = {index: [] for index in entry.missing}
+        for finding in findings:
+            index = index_by_id[finding["id"]]
+            # Keep only the part after the file path, e.g. the member path inside an archive.
+            per_rule[index].append(dict(finding, file=finding["file"][len(entry.filepath):]))
+            entry.cached.append((finding["line"], index, finding))
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+            [(entry.digest, self.fingerprints[index], json.dumps(items)) for index, items in per_rule.items()],
+        )
+        self._store_file(entry)
+        entry.missing = []
+        return entry.findings()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
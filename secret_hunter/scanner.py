@@ -1,49 +1,559 @@
+import io
 import os
+import codecs
 import re
-import yaml
-from math import log2
-
-def calculate_entropy(text):
-    """Calculates the Shannon entropy of a string."""
-    if not text:
-        return 0
-    entropy = 0
-    for char_code in range(256):
-        char = chr(char_code)
-        frequency = text.count(char) / len(text)
-        if frequency > 0:
-            entropy -= frequency * log2(frequency)
-    return entropy
-
-def scan_file(filepath, rules):
-    """Scans a single file for secrets."""
+import mmap
+import shutil
+import time
+import tempfile
+from functools import partial
+from secret_hunter.baseline import load_whitelist, read_baseline
+from secret_hunter.entropy import CHARSETS, is_high_entropy
+# Re-exported for code that imports it from here, where it lived before secret_hunter.entropy.
+from secret_hunter.entropy import calculate_entropy  # noqa: F401
+from secret_hunter.findings import Finding, match_secret, secret_hash
+from secret_hunter.rules import compile_rules, load_rules
+from secret_hunter.scan_cache import ScanCache
+from secret_hunter.stats import ScanStats
+from secret_hunter.triage import DEFAULT_EXCLUDES, SNIFF_SIZE, TYPE_OVERRIDES, classify, in_shard, shard_key, walk_files
+
+# Target number of batches handed to each worker process. More batches give
+# better load balancing; fewer give less inter-process overhead.
+BATCHES_PER_JOB = 4
+
+# Files at least this large are memory-mapped and scanned as bytes in
+# overlapping windows, so neither the file nor any of its lines is ever
+# materialized in memory as a whole.
+LARGE_FILE_SIZE = 8 * 1024 * 1024
+WINDOW_SIZE = 4 * 1024 * 1024
+WINDOW_OVERLAP = 64 * 1024
+# Characters (bytes for memory-mapped files) of context kept on each side of
+# a match when its line is very long.
+MAX_SNIPPET_CONTEXT = 1024
+# Binary files are scanned through their runs of printable ASCII, like strings(1).
+MIN_STRING_LENGTH = 4
+STRING_PATTERN = re.compile(rb"[\t\x20-\x7e]{%d,}" % MIN_STRING_LENGTH)
+
+# A window starting inside a token of an entropy rule's charset only sees its suffix.
+_TOKEN_CHARACTERS = {name: re.compile(character_class.encode("ascii")) for name, character_class in CHARSETS.items()}
+
+_worker_scanner = None
+
+def _trim_snippet(line, start, end):
+    """Returns the stripped line around a match, trimmed to MAX_SNIPPET_CONTEXT on each side."""
+    return line[max(0, start - MAX_SNIPPET_CONTEXT):end + MAX_SNIPPET_CONTEXT].strip()
+
+def _suppressed(allowlist, rule, secret, filepath, stats):
+    """Returns True if the allowlist accepts the match, counting it in a ScanStats if given."""
+    if allowlist is None or not allowlist.suppresses(rule.id, secret, filepath):
+        return False
+    if stats is not None:
+        stats.findings_suppressed += 1
+    return True
+
+def _text_finding(rule, filepath, line_number, text, column_offset=0, allowlist=None, stats=None):
+    """
+    Builds the finding of a rule known to match the text, locating the match
+    to trim the snippet. Returns None if the allowlist accepts the match.
+    """
+    match = rule.find(text)
+    start, end = (0, 0) if match is None else match.span()
+    secret = secret_hash("" if match is None else match_secret(match))
+    if _suppressed(allowlist, rule, secret, filepath, stats):
+        return None
+    return Finding(rule.info, filepath, line_number, _trim_snippet(text, start, end),
+                   column_offset + start + 1, column_offset + end + 1, secret)
+
+def scan_lines(lines, filepath, rules, stats=None, allowlist=None):
+    """
+    Scans an iterable of lines for secrets, reporting them under the given
+    file path. With a ScanStats, matching time is recorded per rule. Matches
+    accepted by an Allowlist are dropped before their finding is built.
+    """
+    rules = compile_rules(rules)
+    match = rules.match if stats is None else partial(rules.profiled_match, stats=stats)
     findings = []
+    for line_number, line in enumerate(lines, 1):
+        for rule in match(line):
+            finding = _text_finding(rule, filepath, line_number, line, 0, allowlist, stats)
+            if finding is not None:
+                findings.append(finding)
+    return findings
+
+def _count_newlines(buffer, start, end):
+    """Counts newlines in buffer[start:end] without copying more than a window at a time."""
+    count = 0
+    for offset in range(start, end, WINDOW_SIZE):
+        count += buffer[offset:min(end, offset + WINDOW_SIZE)].count(b"\n")
+    return count
+
+def _count_characters(buffer, start, end):
+    """
+    Counts the characters of buffer[start:end] as the line scan decodes them,
+    without copying more than a window at a time.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    count = 0
+    for offset in range(start, end, WINDOW_SIZE):
+        count += len(decoder.decode(buffer[offset:min(end, offset + WINDOW_SIZE)]))
+    return count + len(decoder.decode(b"", final=True))
+
+def _line_snippet(buffer, start, end):
+    """Returns the stripped line around a match, trimmed to MAX_SNIPPET_CONTEXT on each side."""
+    line_start = buffer.rfind(b"\n", max(0, start - MAX_SNIPPET_CONTEXT), start) + 1
+    if line_start == 0 and start > MAX_SNIPPET_CONTEXT:
+        line_start = start - MAX_SNIPPET_CONTEXT
+    line_end = buffer.find(b"\n", end, end + MAX_SNIPPET_CONTEXT)
+    if line_end == -1:
+        line_end = min(len(buffer), end + MAX_SNIPPET_CONTEXT)
+    return buffer[line_start:line_end].decode("utf-8", errors="ignore").strip()
+
+def _iter_window_matches(buffer, rule, start, end, limit):
+    """
+    Yields the rule's first match on each line that begins in
+    buffer[start:limit]. A match that runs across a newline, or up to the end
+    of the window where $ and word boundaries would see a false end of text,
+    is retried within its own line. After a match the search resumes on the
+    next line, as the line scan reports a rule once per line, so a line
+    repeating a secret costs one match rather than one per repetition.
+
+    An entropy token cut by the start of the window belongs to the previous
+    window, which sees it whole, so its suffix is skipped here.
+    """
+    pattern = rule.long_byte_pattern
+    pos = start
+    while pos < limit:
+        match = pattern.search(buffer, pos, end)
+        if match is None or match.start() >= limit:
+            return
+        if rule.entropy is not None and match.start() == start > 0 \
+                and _TOKEN_CHARACTERS[rule.charset].match(buffer, start - 1):
+            pos = match.end()
+            continue
+        if buffer.find(b"\n", match.start(), match.end() - 1) != -1 or (match.end() == end < len(buffer)):
+            line_end = buffer.find(b"\n", match.start())
+            line_end = len(buffer) if line_end == -1 else line_end + 1
+            for match in pattern.finditer(buffer, match.start(), line_end):
+                if rule.entropy is None or is_high_entropy(match.group(), rule.entropy):
+                    yield match
+                    break
+            pos = line_end
+            continue
+        if rule.entropy is None or is_high_entropy(match.group(), rule.entropy):
+            yield match
+            line_end = buffer.find(b"\n", match.end(), end)
+            pos = limit if line_end == -1 else line_end + 1
+            continue
+        pos = max(match.end(), match.start() + 1)
+
+def scan_buffer(buffer, filepath, rules, stats=None, allowlist=None):
+    """
+    Scans a bytes-like buffer (typically a memory map) for secrets using byte
+    patterns over overlapping windows. Line numbers are only worked out for
+    actual matches.
+    """
+    rules = compile_rules(rules)
+    if stats is not None:
+        scan_start = time.perf_counter()
+    matches = {}
+    for start in range(0, len(buffer), WINDOW_SIZE):
+        limit = start + WINDOW_SIZE
+        end = min(len(buffer), limit + WINDOW_OVERLAP)
+        combined_hit = rules.combined_bytes is None or rules.combined_bytes.search(buffer, start, end) is not None
+        for rule in rules:
+            if rule.byte_literal:
+                if buffer.find(rule.byte_literal, start, end) == -1:
+                    continue
+            elif not combined_hit and rules.in_combined(rule):
+                continue
+            if stats is not None:
+                rule_start = time.perf_counter()
+                rule_matches = list(_iter_window_matches(buffer, rule, start, end, limit))
+                stats.add_rule(rule.id, time.perf_counter() - rule_start)
+            else:
+                rule_matches = _iter_window_matches(buffer, rule, start, end, limit)
+            for match in rule_matches:
+                matches.setdefault((match.start(), rule.index), (match, rule))
+    if stats is not None:
+        stats.match_seconds += time.perf_counter() - scan_start
+
+    findings = []
+    seen = set()
+    offset = 0
+    line_number = 1
+    line_start = 0
+    for (match_start, _), (match, rule) in sorted(matches.items()):
+        newlines = _count_newlines(buffer, offset, match_start)
+        if newlines:
+            line_number += newlines
+            line_start = buffer.rfind(b"\n", offset, match_start) + 1
+        offset = match_start
+        if (line_number, rule.index) in seen:
+            continue
+        seen.add((line_number, rule.index))
+        if stats is not None:
+            stats.rule_matches[rule.id] = stats.rule_matches.get(rule.id, 0) + 1
+        secret = secret_hash(match_secret(match))
+        if _suppressed(allowlist, rule, secret, filepath, stats):
+            continue
+        # Columns count characters, as in the line scan, not bytes.
+        column = _count_characters(buffer, line_start, match.start()) + 1
+        findings.append((line_number, rule.index, Finding(
+            rule.info, filepath, line_number, _line_snippet(buffer, match.start(), match.end()),
+            column, column + _count_characters(buffer, match.start(), match.end()), secret,
+        )))
+    return [finding for _, _, finding in sorted(findings, key=lambda item: item[:2])]
+
+def scan_strings(buffer, filepath, rules, stats=None, allowlist=None):
+    """
+    Scans the printable strings of a binary buffer. Each string is matched as
+    a line of its own and reported at the line it sits on, counting newline
+    bytes the way a text scan would.
+    """
+    rules = compile_rules(rules)
+    match_text = rules.match if stats is None else partial(rules.profiled_match, stats=stats)
+    findings = []
+    seen = set()
+    offset = 0
+    line_number = 1
+    line_start = 0
+    for match in STRING_PATTERN.finditer(buffer):
+        text = match.group().decode("ascii")
+        matched = match_text(text)
+        if not matched:
+            continue
+        newlines = _count_newlines(buffer, offset, match.start())
+        if newlines:
+            line_number += newlines
+            line_start = buffer.rfind(b"\n", offset, match.start()) + 1
+        offset = match.start()
+        for rule in matched:
+            if (line_number, rule.index) in seen:
+                continue
+            seen.add((line_number, rule.index))
+            finding = _text_finding(rule, filepath, line_number, text, match.start() - line_start, allowlist, stats)
+            if finding is not None:
+                findings.append((line_number, rule.index, finding))
+    return [finding for _, _, finding in sorted(findings, key=lambda item: item[:2])]
+
+def _map_file(f):
+    """Memory-maps an open file for a single sequential read."""
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
+
+def scan_file(filepath, rules, target_type="auto", stats=None, allowlist=None):
+    """
+    Scans a single file for secrets. The file is classified from its first
+    bytes: media files are skipped and binaries are scanned through their
+    printable strings. A target_type of "bin" or "file" forces a binary or
+    text scan. A ScanStats, if given, records the file and its matching time.
+    Matches accepted by an Allowlist are left out.
+    """
+    rules = compile_rules(rules)
     try:
-        with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-            for line_number, line in enumerate(f, 1):
-                for rule in rules:
-                    if re.search(rule["regex"], line):
-                        findings.append({
-                            "id": rule["id"],
-                            "file": filepath,
-                            "line": line_number,
-                            "snippet": line.strip(),
-                            "type": rule["type"],
-                            "confidence": rule["confidence"],
-                        })
+        with open(filepath, "rb") as f:
+            kind = TYPE_OVERRIDES.get(target_type) or classify(f.read(SNIFF_SIZE))
+            if kind == "media":
+                if stats is not None:
+                    stats.files_skipped += 1
+                return []
+            size = os.fstat(f.fileno()).st_size
+            if stats is not None:
+                stats.record_file(size)
+            if kind == "binary":
+                if size == 0:
+                    return []
+                with _map_file(f) as mm:
+                    return scan_strings(mm, filepath, rules, stats, allowlist)
+            if rules.bytes_compatible and size >= LARGE_FILE_SIZE:
+                with _map_file(f) as mm:
+                    return scan_buffer(mm, filepath, rules, stats, allowlist)
+            f.seek(0)
+            return scan_lines(io.TextIOWrapper(f, encoding="utf-8", errors="ignore"), filepath, rules, stats, allowlist)
     except Exception as e:
         print(f"Error scanning file {filepath}: {e}")
-    return findings
+    return []
 
-def scan_directory(directory, rules_file, whitelist_file, no_decompile, max_depth):
-    """Scans a directory for secrets."""
-    with open(rules_file, "r") as f:
-        rules = yaml.safe_load(f)["rules"]
+def _make_batches(tasks, batch_count):
+    """
+    Splits (task, size) pairs into contiguous batches of roughly equal total
+    size. Keeping batches contiguous lets results be emitted in file order as
+    soon as each batch finishes.
+    """
+    total_size = sum(size for _, size in tasks) + len(tasks)
+    target_size = total_size / batch_count
+    batches = []
+    batch = []
+    batch_size = 0
+    for task, size in tasks:
+        batch.append(task)
+        batch_size += size + 1
+        if batch_size >= target_size:
+            batches.append(batch)
+            batch = []
+            batch_size = 0
+    if batch:
+        batches.append(batch)
+    return batches
 
-    findings = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            filepath = os.path.join(root, file)
-            findings.extend(scan_file(filepath, rules))
+class _RuleSubsetScanner:
+    """
+    Scans files with all rules or with a subset of them, compiling each subset
+    once. Options are the scan settings shared by every file, such as
+    archive_depth. Decompiled artifacts are cached under decompile_dir. With
+    profile set, every scan is recorded in self.stats. Findings accepted by
+    the allowlist, if any, are left out.
+    """
 
-    return findings
+    def __init__(self, rules, options, decompile_dir=None, profile=False, allowlist=None):
+        self.rules = rules
+        self.options = options
+        self.decompile_dir = decompile_dir
+        self.decompile_cache = None
+        self.rulesets = {}
+        self.stats = ScanStats() if profile else None
+        self.allowlist = allowlist
+
+    def _scan_decompiled(self, filepath, ruleset):
+        """Returns the findings of a decompiled artifact, or None if the file is not one."""
+        # Imported here because the decompiler builds on this module.
+        from secret_hunter.decompiler import DECOMPILER_BACKENDS, DecompileCache, is_decompilable, scan_artifact
+        if self.options.get("target_type") not in ("jar", "apk") and not is_decompilable(filepath):
+            return None
+        if self.decompile_cache is None:
+            backend = DECOMPILER_BACKENDS[self.options["decompiler"]]()
+            self.decompile_cache = DecompileCache(self.decompile_dir, backend)
+        try:
+            return scan_artifact(filepath, ruleset, self.decompile_cache)
+        except Exception as e:
+            print(f"Error decompiling {filepath}: {e}")
+            return None
+
+    def scan(self, filepath, rule_indices=None):
+        key = None if rule_indices is None else tuple(rule_indices)
+        ruleset = self.rulesets.get(key)
+        if ruleset is None:
+            subset = self.rules if key is None else [self.rules[index] for index in key]
+            ruleset = self.rulesets[key] = compile_rules(subset)
+        if self.stats is None:
+            return self._scan(filepath, ruleset)
+
+        # Whatever part of the scan is not matching is reading, decoding or decompiling.
+        start = time.perf_counter()
+        match_seconds = self.stats.match_seconds
+        findings = self._scan(filepath, ruleset)
+        self.stats.io_seconds += time.perf_counter() - start - (self.stats.match_seconds - match_seconds)
+        return findings
+
+    def _scan(self, filepath, ruleset):
+        if self.options.get("decompiler"):
+            findings = self._scan_decompiled(filepath, ruleset)
+            if findings is not None:
+                self._record_container(filepath)
+                return self._filter(findings)
+        archive_depth = self.options.get("archive_depth", 0)
+        if archive_depth:
+            # Imported here because archive_scan builds on this module.
+            from secret_hunter.archive_scan import is_archive, scan_archive
+            if is_archive(filepath):
+                self._record_container(filepath)
+                return self._filter(scan_archive(filepath, ruleset, archive_depth))
+        return scan_file(filepath, ruleset, self.options.get("target_type", "auto"), self.stats, self.allowlist)
+
+    def _filter(self, findings):
+        """Drops the allowlisted findings of an archive or artifact, whose members are scanned elsewhere."""
+        if self.allowlist is None:
+            return findings
+        return list(self.allowlist.filter(findings, self.stats))
+
+    def _record_container(self, filepath):
+        """Counts an archive or artifact, whose members are not profiled one by one."""
+        if self.stats is not None:
+            self.stats.record_file(os.path.getsize(filepath))
+
+    def take_stats(self):
+        """Returns the stats collected so far as a dict and starts counting afresh."""
+        stats = self.stats.to_dict()
+        self.stats = ScanStats()
+        return stats
+
+def _init_worker(rules, options, decompile_dir, profile, allowlist):
+    """Compiles the rules once per worker process."""
+    global _worker_scanner
+    _worker_scanner = _RuleSubsetScanner(rules, options, decompile_dir, profile, allowlist)
+
+def _scan_batch(batch):
+    """
+    Scans a batch of (filepath, rule_indices) tasks inside a worker process.
+    Returns the findings of each task and, when profiling, the batch's stats.
+    """
+    results = [_worker_scanner.scan(filepath, rule_indices) for filepath, rule_indices in batch]
+    return results, _worker_scanner.take_stats() if _worker_scanner.stats is not None else None
+
+def _scan_tasks(tasks, rules, jobs, options, decompile_dir=None, stats=None, allowlist=None):
+    """
+    Yields the findings of each (filepath, rule_indices) task, in task order.
+    Closing the generator early cancels the batches no worker has started.
+    """
+    profile = stats is not None
+    if jobs > 1 and len(tasks) > 1:
+        # Imported here so single-process scans do not load multiprocessing.
+        from concurrent.futures import ProcessPoolExecutor
+        batches = _make_batches(tasks, jobs * BATCHES_PER_JOB)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(rules, options, decompile_dir, profile, allowlist)) as executor:
+            futures = [executor.submit(_scan_batch, batch) for batch in batches]
+            try:
+                for future in futures:
+                    batch_findings, batch_stats = future.result()
+                    if profile:
+                        stats.merge(batch_stats)
+                    yield from batch_findings
+            finally:
+                for future in futures:
+                    future.cancel()
+    else:
+        scanner = _RuleSubsetScanner(rules, options, decompile_dir, profile, allowlist)
+        if profile:
+            scanner.stats = stats
+        for (filepath, rule_indices), _ in tasks:
+            yield scanner.scan(filepath, rule_indices)
+
+def _scan_cached(files, rules, jobs, options, cache, decompile_dir=None, stats=None):
+    """Yields the findings of each file, reusing cached results and scanning only what is missing."""
+    entries = []
+    for filepath, size in files:
+        try:
+            entries.append(cache.lookup(filepath))
+        except OSError:
+            entries.append(None)
+
+    tasks = []
+    for (filepath, size), entry in zip(files, entries):
+        if entry is None:
+            tasks.append(((filepath, None), size))
+        elif entry.missing:
+            tasks.append(((filepath, entry.missing), size))
+
+    if stats is not None:
+        stats.files_cached += len(files) - len(tasks)
+    scanned = _scan_tasks(tasks, rules, jobs, options, decompile_dir, stats)
+    try:
+        for entry in entries:
+            if entry is None:
+                yield next(scanned)
+            elif entry.missing:
+                yield cache.store(entry, next(scanned))
+            else:
+                yield entry.findings()
+    finally:
+        scanned.close()
+
+def scan_directory(directory, rules_file, whitelist_file, no_decompile, max_depth, jobs=1, cache_path=None,
+                   archive_depth=0, excludes=DEFAULT_EXCLUDES, max_file_size=None, target_type="auto",
+                   decompiler="auto", decompile_dir=None, stats=None, rules_cache_dir=None, progress=None,
+                   cancel=None, baseline_file=None, new_only=False, shard=None):
+    """
+    Scans a directory (or a single file) for secrets, yielding findings as
+    soon as each file has been scanned.
+
+    With jobs > 1, files are scanned by a pool of worker processes (jobs=0 uses
+    every CPU). Findings are always ordered by file and then by line. When a
+    cache_path is given, findings of unchanged files are reused from the
+    scan cache instead of reading the files again. With archive_depth > 0,
+    zip and tar archives are scanned member by member without extraction,
+    recursing into nested archives up to that depth.
+
+    Before scanning, directories matching the .gitignore-style excludes or
+    deeper than max_depth are pruned, and media files and files larger than
+    max_file_size bytes are skipped. target_type "bin" or "file" forces every
+    file to be scanned as a binary or as text.
+
+    Jar, apk, dex and class files (every file with target_type "jar" or
+    "apk") are decompiled by the chosen decompiler backend, or only reduced to
+    their strings with no_decompile, and the output is scanned. Decompiled
+    output is cached by artifact hash under decompile_dir, or in a temporary
+    directory for the duration of the scan.
+
+    Passing a ScanStats turns on profiling: per-rule matching time and
+    matches, bytes read, skipped files and I/O versus matching time are
+    collected into it, including from worker processes.
+
+    With a rules_cache_dir, the validated rules are kept there in serialized
+    form, so the rules file is only parsed again after it changes.
+
+    After each file, progress (if given) is called with the number of files
+    done, the total number of files, and the bytes done and in total. Setting
+    the cancel event stops the scan after the current file; worker batches
+    not yet started are dropped.
+
+    Findings accepted by the whitelist_file (a YAML whitelist or a previous
+    report) are never reported. Findings also present in the report given as
+    baseline_file are marked with "baseline": true, or left out with
+    new_only. Without a scan cache, both are checked as matches are found,
+    before findings are built; the scan cache keeps every finding, so cached
+    results are filtered as they are read.
+
+    With a shard (i, N), only the files whose path relative to the target
+    falls in shard i of N are scanned. Running every shard, on any number of
+    hosts, scans each file exactly once; merge_reports combines the reports.
+
+    A target that does not exist raises FileNotFoundError rather than
+    yielding no findings.
+    """
+    if not os.path.exists(directory):
+        raise FileNotFoundError(f"Scan target does not exist: {directory}")
+    # Imported here because the decompiler builds on this module.
+    from secret_hunter.decompiler import get_backend
+    rules = load_rules(rules_file, rules_cache_dir)
+    options = {"archive_depth": archive_depth, "target_type": target_type, "decompiler": None}
+    if target_type not in TYPE_OVERRIDES:
+        options["decompiler"] = get_backend(decompiler, no_decompile).name
+    temporary_dir = None
+    if decompile_dir is None:
+        decompile_dir = temporary_dir = tempfile.mkdtemp(prefix="secret-hunter-decompile-")
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    allowlist = load_whitelist(whitelist_file, directory) if whitelist_file else None
+    known = read_baseline(baseline_file, directory) if baseline_file else None
+    if known is not None and new_only:
+        allowlist = known if allowlist is None else allowlist.update(known)
+        known = None
+
+    start = time.perf_counter()
+    files = sorted(walk_files(directory, max_depth, excludes, max_file_size, stats))
+    if shard is not None:
+        files = [(filepath, size) for filepath, size in files if in_shard(shard_key(filepath, directory), shard)]
+    total_size = sum(size for _, size in files)
+    cache = None
+    try:
+        if cache_path:
+            cache = ScanCache(cache_path, rules, options)
+            results = _scan_cached(files, rules, jobs, options, cache, decompile_dir, stats)
+        else:
+            tasks = [((filepath, None), size) for filepath, size in files]
+            results = _scan_tasks(tasks, rules, jobs, options, decompile_dir, stats, allowlist)
+        try:
+            done_size = 0
+            for done, ((_, size), file_findings) in enumerate(zip(files, results), 1):
+                if cache is not None and allowlist is not None:
+                    file_findings = allowlist.filter(file_findings, stats)
+                if known is not None:
+                    file_findings = known.mark(file_findings)
+                yield from file_findings
+                done_size += size
+                if progress is not None:
+                    progress(done, len(files), done_size, total_size)
+                if cancel is not None and cancel.is_set():
+                    break
+        finally:
+            results.close()
+    finally:
+        if cache is not None:
+            cache.close()
+        if temporary_dir:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+        if stats is not None:
+            stats.wall_seconds += time.perf_counter() - start
@@ -0,0 +1,74 @@
+# Pseudo rule ids for work shared by several rules.
+COMBINED_PREFILTER = "(combined prefilter)"
+ENTROPY_TOKENS = "(entropy tokens)"
+
+
+class ScanStats:
+    """
+    Counters collected by a profiled scan. Matching time is charged to the
+    rule it ran for, and the rest of the time spent on a file (reading,
+    decoding, decompiling) counts as I/O. Worker processes each fill their
+    own ScanStats, which are merged into the parent's through to_dict and
+    merge, so times are summed over workers.
+    """
+
+    COUNTERS = ("files_scanned", "files_cached", "files_skipped", "dirs_pruned", "bytes_read", "findings_suppressed")
+    TIMERS = ("io_seconds", "match_seconds", "wall_seconds")
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        for name in self.TIMERS:
+            setattr(self, name, 0.0)
+        self.rule_seconds = {}
+        self.rule_matches = {}
+
+    def add_rule(self, rule_id, seconds, matched=False):
+        self.rule_seconds[rule_id] = self.rule_seconds.get(rule_id, 0.0) + seconds
+        if matched:
+            self.rule_matches[rule_id] = self.rule_matches.get(rule_id, 0) + 1
+
+    def record_file(self, size):
+        self.files_scanned += 1
+        self.bytes_read += size
+
+    def to_dict(self):
+        stats = {name: getattr(self, name) for name in self.COUNTERS}
+        stats.update({name: round(getattr(self, name), 6) for name in self.TIMERS})
+        stats["rules"] = {
+            rule_id: {"seconds": round(seconds, 6), "matches": self.rule_matches.get(rule_id, 0)}
+            for rule_id, seconds in sorted(self.rule_seconds.items(), key=lambda item: -item[1])
+        }
+        return stats
+
+    def merge(self, stats):
+        """Adds the counters of another ScanStats, or of its to_dict(), to this one."""
+        if isinstance(stats, ScanStats):
+            stats = stats.to_dict()
+        for name in self.COUNTERS + self.TIMERS:
+            if name != "wall_seconds":
+                # Reports written before a counter existed do not have it.
+                setattr(self, name, getattr(self, name) + stats.get(name, 0))
+        for rule_id, rule in stats["rules"].items():
+            self.rule_seconds[rule_id] = self.rule_seconds.get(rule_id, 0.0) + rule["seconds"]
+            if rule["matches"]:
+                self.rule_matches[rule_id] = self.rule_matches.get(rule_id, 0) + rule["matches"]
+
+    def format_table(self):
+        """Returns a human-readable summary with the most expensive rules first."""
+        mb = self.bytes_read / 1024 / 1024
+        lines = [
+            "Scan profile",
+            f"  files scanned: {self.files_scanned}, from cache: {self.files_cached}, "
+            f"skipped: {self.files_skipped}, directories pruned: {self.dirs_pruned}",
+            f"  findings suppressed by the whitelist or baseline: {self.findings_suppressed}",
+            f"  read: {mb:.2f} MB in {self.wall_seconds:.3f}s wall"
+            + (f" ({mb / self.wall_seconds:.2f} MB/s)" if self.wall_seconds else ""),
+            f"  I/O and decoding: {self.io_seconds:.3f}s, matching: {self.match_seconds:.3f}s (summed over workers)",
+            "",
+            f"  {'rule':<32}{'seconds':>10}{'share':>8}{'matches':>9}",
+        ]
+        total = sum(self.rule_seconds.values()) or 1
+        for rule_id, seconds in sorted(self.rule_seconds.items(), key=lambda item: -item[1]):
+            lines.append(f"  {rule_id:<32}{seconds:>10.4f}{seconds / total:>8.1%}{self.rule_matches.get(rule_id, 0):>9}")
+        return "\n".join(lines)
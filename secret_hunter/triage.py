@@ -0,0 +1,219 @@
+import os
+import re
+import zlib
+
+# Directories and files that hold vendored code, VCS internals or generated
+# lockfiles. Patterns use .gitignore syntax.
+DEFAULT_EXCLUDES = (
+    ".git/", ".hg/", ".svn/", "node_modules/", "bower_components/", "__pycache__/",
+    ".tox/", ".venv/", ".mypy_cache/", ".pytest_cache/",
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock",
+    "Cargo.lock", "composer.lock", "Gemfile.lock", "go.sum",
+)
+# Media files are skipped by name, without being opened.
+MEDIA_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".tif", ".tiff", ".psd",
+    ".mp3", ".mp4", ".m4a", ".m4v", ".wav", ".flac", ".ogg", ".avi", ".mov", ".mkv", ".webm",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+)
+# (offset, magic bytes) of media formats recognised from a file's first bytes.
+MEDIA_MAGIC = (
+    (0, b"\x89PNG\r\n\x1a\n"), (0, b"\xff\xd8\xff"), (0, b"GIF87a"), (0, b"GIF89a"),
+    (0, b"ID3"), (0, b"fLaC"), (0, b"OggS"), (0, b"RIFF"), (0, b"\x1a\x45\xdf\xa3"),
+    (0, b"wOFF"), (0, b"wOF2"), (4, b"ftyp"),
+)
+# Bytes read from the start of a file to classify it.
+SNIFF_SIZE = 8192
+# --type values that force how every file is read instead of classifying it.
+TYPE_OVERRIDES = {"bin": "binary", "file": "text"}
+
+
+def _translate(pattern):
+    """
+    Translates one .gitignore-style pattern into a regex over "/"-separated
+    relative paths. Returns the regex and whether it only matches directories.
+    """
+    dir_only = pattern.endswith("/")
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and pattern.find("]", i + 2) != -1:
+            end = pattern.find("]", i + 2)
+            chars = pattern[i + 1:end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            parts.append("[" + chars.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ("" if anchored else "(?:.*/)?") + "".join(parts), dir_only
+
+
+class ExcludeMatcher:
+    """
+    Matches relative paths against .gitignore-style patterns. A pattern with a
+    slash is anchored at the scan root, one without matches at any depth, and
+    a trailing slash restricts it to directories. All patterns are combined
+    into one regex per kind, so each path costs a single match.
+    """
+
+    def __init__(self, patterns):
+        dir_patterns = []
+        file_patterns = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            regex, dir_only = _translate(pattern)
+            dir_patterns.append(regex)
+            if not dir_only:
+                file_patterns.append(regex)
+        self.dir_regex = self._combine(dir_patterns)
+        self.file_regex = self._combine(file_patterns)
+
+    @staticmethod
+    def _combine(patterns):
+        if not patterns:
+            return None
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+    def match(self, relpath, is_dir=False):
+        regex = self.dir_regex if is_dir else self.file_regex
+        return regex is not None and regex.fullmatch(relpath.replace(os.sep, "/")) is not None
+
+
+def read_exclude_file(path):
+    """Reads .gitignore-style patterns from a file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def build_excludes(patterns=(), exclude_files=(), default_excludes=True):
+    """Combines the default excludes with patterns given directly and read from .gitignore-style files."""
+    excludes = list(DEFAULT_EXCLUDES) if default_excludes else []
+    excludes.extend(patterns)
+    for path in exclude_files:
+        excludes.extend(read_exclude_file(path))
+    return excludes
+
+
+def subdirectory_exclude(target, directory):
+    """
+    Returns an exclude pattern anchored at the target for a directory inside
+    it, such as the tool's own cache directory, or None if the directory is
+    not below the target.
+    """
+    if os.path.isfile(target):
+        return None
+    relpath = os.path.relpath(os.path.realpath(directory), os.path.realpath(target))
+    if relpath == os.curdir or relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+        return None
+    escaped = re.sub(r"[][*?]", lambda match: f"[{match.group()}]", relpath.replace(os.sep, "/"))
+    return f"/{escaped}/"
+
+
+def is_media_name(filename):
+    """Returns True if the file name has the extension of an image, audio, video or font file."""
+    return filename.lower().endswith(MEDIA_EXTENSIONS)
+
+
+def classify(head):
+    """
+    Classifies a file from its first bytes as "media" (never scanned),
+    "binary" (scanned through its printable strings) or "text".
+    """
+    for offset, magic in MEDIA_MAGIC:
+        if head.startswith(magic, offset):
+            return "media"
+    if b"\0" in head:
+        return "binary"
+    return "text"
+
+
+def parse_shard(value):
+    """Parses an "i/N" shard spec, numbered from 1, into an (i, N) pair."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"expected i/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise ValueError(f"shard {index} is not between 1 and {count}")
+    return index, count
+
+
+def in_shard(key, shard):
+    """
+    Returns True if the key (a relative path, a blob sha or a source URL)
+    belongs to shard (i, N). Keys are assigned by a CRC-32 of the key, which
+    is the same on every host and Python version, so independent workers
+    split the same set without coordinating.
+    """
+    index, count = shard
+    return zlib.crc32(key.encode("utf-8", errors="surrogateescape")) % count == index - 1
+
+
+def shard_key(filepath, target):
+    """Returns the key of a file for in_shard: its "/"-separated path relative to the scan target."""
+    root = target if os.path.isdir(target) else os.path.dirname(target)
+    return os.path.relpath(filepath, root or os.curdir).replace(os.sep, "/")
+
+
+def walk_files(target, max_depth=None, excludes=DEFAULT_EXCLUDES, max_file_size=None, stats=None):
+    """
+    Yields (filepath, size) for every file worth scanning under the target, or
+    for the target itself if it is a file. Excluded directories and those more
+    than max_depth levels below the target are pruned without being listed.
+    Excluded files, media files and files larger than max_file_size bytes are
+    skipped without being opened. A ScanStats, if given, counts what was
+    pruned and skipped.
+    """
+    if os.path.isfile(target):
+        yield target, os.path.getsize(target)
+        return
+
+    matcher = ExcludeMatcher(excludes or ())
+    for root, dirs, files in os.walk(target):
+        relroot = os.path.relpath(root, target)
+        if relroot == os.curdir:
+            relroot = ""
+            depth = 0
+        else:
+            depth = relroot.count(os.sep) + 1
+
+        kept = [] if max_depth is not None and depth >= max_depth else [
+            name for name in dirs if not matcher.match(os.path.join(relroot, name), is_dir=True)
+        ]
+        if stats is not None:
+            stats.dirs_pruned += len(dirs) - len(kept)
+        dirs[:] = kept
+
+        for name in files:
+            if is_media_name(name) or matcher.match(os.path.join(relroot, name)):
+                if stats is not None:
+                    stats.files_skipped += 1
+                continue
+            filepath = os.path.join(root, name)
+            try:
+                size = os.path.getsize(filepath)
+            except OSError:
+                size = 0
+            if max_file_size is not None and size > max_file_size:
+                if stats is not None:
+                    stats.files_skipped += 1
+                continue
+            yield filepath, size
@@ -0,0 +1,82 @@
+import unittest
+import os
+import shutil
+import tempfile
+import zipfile
+from secret_hunter.artifact_cache import ArtifactCache
+
+
+class TestArtifactCache(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = ArtifactCache(self.test_dir, max_size_mb=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _store(self, url, digest, content=b"data"):
+        path = self.cache.download_path(url)
+        with open(path, "wb") as f:
+            f.write(content)
+        return self.cache.store(url, digest, path)
+
+    def test_same_basename_does_not_collide(self):
+        self._store("https://a.example.com/v1.0.zip", "a" * 64, b"first")
+        self._store("https://b.example.com/v1.0.zip", "b" * 64, b"second")
+
+        with open(self.cache.archive_path(self.cache.lookup("https://a.example.com/v1.0.zip")), "rb") as f:
+            self.assertEqual(f.read(), b"first")
+        with open(self.cache.archive_path(self.cache.lookup("https://b.example.com/v1.0.zip")), "rb") as f:
+            self.assertEqual(f.read(), b"second")
+
+    def test_lookup_by_checksum(self):
+        self._store("https://a.example.com/pkg.zip", "c" * 64)
+
+        self.assertEqual(self.cache.lookup("https://mirror.example.com/pkg.zip", "C" * 64), "c" * 64)
+        self.assertIsNone(self.cache.lookup("https://a.example.com/pkg.zip", "d" * 64))
+        self.assertIsNone(self.cache.lookup("https://unknown.example.com/pkg.zip"))
+
+    def test_extract_skipped_when_marker_present(self):
+        digest = self._store("https://example.com/pkg.zip", "e" * 64)
+        calls = []
+
+        def extract(archive_path, extract_dir):
+            calls.append(archive_path)
+            os.makedirs(extract_dir)
+            with open(os.path.join(extract_dir, "file.txt"), "w") as f:
+                f.write("content")
+
+        first = self.cache.extract(digest, extract)
+        second = self.cache.extract(digest, extract)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+
+    def test_interrupted_extraction_is_redone(self):
+        digest = self._store("https://example.com/pkg.zip", "f" * 64)
+
+        def failing_extract(archive_path, extract_dir):
+            os.makedirs(extract_dir)
+            raise zipfile.BadZipFile("truncated")
+
+        with self.assertRaises(zipfile.BadZipFile):
+            self.cache.extract(digest, failing_extract)
+        extract_dir = self.cache.extract(digest, lambda archive_path, extract_dir: os.makedirs(extract_dir))
+        self.assertTrue(os.path.isdir(extract_dir))
+
+    def test_evict_least_recently_used(self):
+        chunk = b"x" * (400 * 1024)
+        oldest = self._store("https://example.com/old.zip", "1" * 64, chunk)
+        middle = self._store("https://example.com/middle.zip", "2" * 64, chunk)
+        os.utime(os.path.join(self.test_dir, "artifacts", "objects", oldest, "entry.json"), (1, 1))
+        os.utime(os.path.join(self.test_dir, "artifacts", "objects", middle, "entry.json"), (2, 2))
+        newest = self._store("https://example.com/new.zip", "3" * 64, chunk)
+
+        self.assertEqual(self.cache.evict(keep=[newest]), [oldest])
+        self.assertIsNone(self.cache.lookup("https://example.com/old.zip"))
+        self.assertEqual(self.cache.lookup("https://example.com/middle.zip"), middle)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import os
+import shutil
+import tempfile
+from secret_hunter.benchmark import compare, generate_corpus, run_benchmark
+from secret_hunter.scan_cache import file_digest
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _digests(self, directory):
+        digests = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                digests[os.path.relpath(path, directory)] = file_digest(path)
+        return digests
+
+    def test_corpus_is_deterministic(self):
+        first = os.path.join(self.test_dir, "first")
+        second = os.path.join(self.test_dir, "second")
+        summary = generate_corpus(first, seed=7, scale=0.01)
+        self.assertEqual(generate_corpus(second, seed=7, scale=0.01), summary)
+        self.assertEqual(self._digests(first), self._digests(second))
+        self.assertGreater(summary["seeded_secrets"], 0)
+
+    def test_run_benchmark_reports_scenarios_and_rules(self):
+        # Only the huge files of the corpus count, even under a directory named like theirs.
+        corpus = os.path.join(self.test_dir, "data", "corpus")
+        generate_corpus(corpus, scale=0.01)
+        result = run_benchmark(corpus, "rules.yml", jobs=(1,))
+        self.assertIn("scan_directory_jobs1", result["scenarios"])
+        self.assertEqual(result["scenarios"]["scan_file_huge"]["files"], 1)
+        self.assertGreater(result["scenarios"]["scan_directory_jobs1"]["findings"], 0)
+        self.assertIn("aws-access-key", result["rules"])
+
+    def test_compare_flags_regressions(self):
+        baseline = {"scenarios": {"scan": {"mb_per_s": 100.0}}, "rules": {"slow": {"seconds_per_mb": 0.01}}}
+        current = {"scenarios": {"scan": {"mb_per_s": 95.0}}, "rules": {"slow": {"seconds_per_mb": 0.02}}}
+        regressions = compare(baseline, current, tolerance=0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("rule slow"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from secret_hunter.entropy import calculate_entropy, effective_min_length, token_regex
+from secret_hunter.rules import RuleSet
+from secret_hunter import scanner
+
+class TestEntropy(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = [
+            {"id": "b64", "entropy": {"charset": "base64", "min_length": 20, "threshold": 4.5}, "type": "High Entropy String", "confidence": "Low"},
+            {"id": "hex", "entropy": {"charset": "hex", "min_length": 32, "threshold": 3.0}, "type": "High Entropy Hex String", "confidence": "Low"},
+        ]
+
+    def test_calculate_entropy(self):
+        self.assertEqual(calculate_entropy(""), 0)
+        self.assertEqual(calculate_entropy("aaaa"), 0)
+        self.assertAlmostEqual(calculate_entropy("abcd"), 2.0)
+        self.assertAlmostEqual(calculate_entropy(b"abcd"), 2.0)
+        self.assertIs(scanner.calculate_entropy, calculate_entropy)
+
+    def test_token_regex_skips_tokens_too_short_to_pass(self):
+        self.assertEqual(effective_min_length(20, 4.5), 23)
+        self.assertEqual(effective_min_length(32, 3.0), 32)
+        self.assertEqual(token_regex("hex", 32), "[0-9a-fA-F]{32,}")
+        with self.assertRaises(ValueError):
+            token_regex("octal", 8)
+
+    def test_entropy_rules_match_only_random_tokens(self):
+        ruleset = RuleSet(self.rules)
+        self.assertEqual(ruleset.match_ids("secret = 'wJalrXUtnFEMI/K7MDENG/bPxRfiCYEXAMPLEKEY'\n"), ["b64"])
+        self.assertEqual(ruleset.match_ids("digest = 9e107d9d372bb6826bd81d3542a419d6\n"), ["hex"])
+        self.assertEqual(ruleset.match_ids("name = getElementsByClassNameAndTagName\n"), [])
+        self.assertEqual(ruleset.match_ids("padding = aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa\n"), [])
+        self.assertEqual(ruleset.match_ids("token = Zm9vYmFyOnF1eDEyMzQ1Njc4OTAhQCM=\n"), ["b64"])
+
+    def test_decimal_numbers_are_not_hex_tokens(self):
+        ruleset = RuleSet(self.rules)
+        self.assertEqual(ruleset.match_ids("order_id = 9817263540192837465019283746501928374650\n"), [])
+        self.assertEqual(ruleset.match_ids("digest = 98172635401928374650192837465019283746f0\n"), ["hex"])
+
+    def test_ordinary_source_lines_are_not_flagged(self):
+        ruleset = RuleSet(self.rules)
+        lines = [
+            "                                                  chunk_size=DEFAULT_CHUNK_SIZE)\n",
+            "cache = ArtifactCache(args.cache_dir, getattr(args, \"max_cache_size\", None) or DEFAULT_MAX_CACHE_SIZE_MB)\n",
+            "serve(make_server(service, args.socket or os.path.join(args.cache_dir, DEFAULT_SOCKET_NAME), args.port))\n",
+            "from secret_hunter.triage import DEFAULT_EXCLUDES, SNIFF_SIZE, TYPE_OVERRIDES, classify, in_shard\n",
+            "self.assertEqual(stats.findings_suppressed_by_whitelist_and_baseline, expected_suppressed_count)\n",
+            "parser.add_argument(\"--max-cache-size\", type=int, default=DEFAULT_MAX_CACHE_SIZE_MB)\n",
+            "    test_memory_mapped_scan_matches_line_scan_on_anchored_and_multiline_patterns=True\n",
+        ]
+        self.assertEqual([line for line in lines if ruleset.match_ids(line)], [])
+
+if __name__ == '__main__':
+    unittest.main()
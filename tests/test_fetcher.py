@@ -1,8 +1,12 @@
 import unittest
 from unittest.mock import patch, MagicMock
+import io
 import os
 import shutil
 import tempfile
+import zipfile
+import git
+import requests
 from secret_hunter.fetcher import _download_archive, _fetch_git, _find_license, fetch_source, _verify_checksum
 from argparse import Namespace
 
@@ -46,12 +50,119 @@ class TestFetcher(unittest.TestCase):
         with self.assertRaises(ValueError):
             _download_archive(url, cache_path, max_size_mb=1, timeout=10, expected_checksum=None)
 
+    def _response(self, chunks, status_code=200, etag='"v1"'):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = {'content-length': str(sum(len(chunk) for chunk in chunks))}
+        if etag:
+            response.headers['ETag'] = etag
+        response.iter_content.return_value = chunks
+        return response
+
+    @patch('requests.get')
+    def test_download_archive_resumes_partial_file(self, mock_get):
+        cache_path = os.path.join(self.cache_dir, "test.zip")
+        with open(cache_path + ".part", "wb") as f:
+            f.write(b"te")
+        with open(cache_path + ".validator", "w") as f:
+            f.write('"v1"')
+        mock_get.return_value = self._response([b"st"], status_code=206)
+
+        # SHA256 of "test"
+        checksum = "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+        _download_archive("https://example.com/test.zip", cache_path, max_size_mb=1, timeout=10,
+                          expected_checksum=checksum, chunk_size=4096)
+
+        self.assertEqual(mock_get.call_args[1]["headers"], {"Range": "bytes=2-", "If-Range": '"v1"'})
+        mock_get.return_value.iter_content.assert_called_once_with(chunk_size=4096)
+        self.assertFalse(os.path.exists(cache_path + ".part"))
+        self.assertFalse(os.path.exists(cache_path + ".validator"))
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), b"test")
+
+    @patch('requests.get')
+    def test_download_archive_restarts_when_range_is_ignored(self, mock_get):
+        cache_path = os.path.join(self.cache_dir, "test.zip")
+        with open(cache_path + ".part", "wb") as f:
+            f.write(b"stale")
+        mock_get.return_value = self._response([b"test"])
+
+        _download_archive("https://example.com/test.zip", cache_path, max_size_mb=1, timeout=10, expected_checksum=None)
+
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), b"test")
+
+    @patch('requests.get')
+    def test_download_archive_does_not_resume_without_a_validator(self, mock_get):
+        cache_path = os.path.join(self.cache_dir, "test.zip")
+        with open(cache_path + ".part", "wb") as f:
+            f.write(b"stale")
+        mock_get.return_value = self._response([b"test"])
+
+        _download_archive("https://example.com/test.zip", cache_path, max_size_mb=1, timeout=10, expected_checksum=None)
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertNotIn("headers", mock_get.call_args[1])
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), b"test")
+
+    @patch('requests.get')
+    def test_download_archive_restarts_when_the_file_changed(self, mock_get):
+        cache_path = os.path.join(self.cache_dir, "test.zip")
+        with open(cache_path + ".part", "wb") as f:
+            f.write(b"ol")
+        with open(cache_path + ".validator", "w") as f:
+            f.write('"v1"')
+        # A server that ignores If-Range answers the range from the new version of the file.
+        mock_get.side_effect = [self._response([b"st"], status_code=206, etag='"v2"'),
+                                self._response([b"test"], etag='"v2"')]
+
+        _download_archive("https://example.com/test.zip", cache_path, max_size_mb=1, timeout=10, expected_checksum=None)
+
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), b"test")
+
+    @patch('requests.get')
+    def test_download_archive_retries_interrupted_download(self, mock_get):
+        def interrupted():
+            yield b"te"
+            raise requests.exceptions.ChunkedEncodingError("connection dropped")
+        first = self._response([])
+        first.iter_content.return_value = interrupted()
+        mock_get.side_effect = [first, self._response([b"st"], status_code=206)]
+
+        cache_path = os.path.join(self.cache_dir, "test.zip")
+        _download_archive("https://example.com/test.zip", cache_path, max_size_mb=1, timeout=10, expected_checksum=None)
+
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), b"test")
+
+    @patch('requests.get')
+    def test_download_archive_checksum_mismatch(self, mock_get):
+        mock_get.return_value = self._response([b"test"])
+        cache_path = os.path.join(self.cache_dir, "test.zip")
+
+        with self.assertRaises(ValueError):
+            _download_archive("https://example.com/test.zip", cache_path, max_size_mb=1, timeout=10,
+                              expected_checksum="wrong_checksum")
+        self.assertFalse(os.path.exists(cache_path))
+        self.assertFalse(os.path.exists(cache_path + ".part"))
+
     @patch('git.Repo.clone_from')
     def test_fetch_git_success(self, mock_clone_from):
         url = "https://github.com/example/repo.git"
         _fetch_git(url, branch="main", tag=None, cache_dir=self.cache_dir)
         self.assertTrue(mock_clone_from.called)
 
+    @patch('git.Repo.clone_from')
+    def test_fetch_git_keys_clones_by_url(self, mock_clone_from):
+        with patch("builtins.print"):
+            paths = [_fetch_git(url, branch=None, tag=None, cache_dir=self.cache_dir)
+                     for url in ("https://example.com/a/utils.git", "https://example.com/b/utils.git")]
+        self.assertNotEqual(paths[0], paths[1])
+        self.assertTrue(all(os.path.basename(path).startswith("utils-") for path in paths))
+        self.assertEqual([call[0][1] for call in mock_clone_from.call_args_list], paths)
+
 
     def test_find_license(self):
         license_content = "MIT License"
@@ -101,6 +212,55 @@ class TestFetcher(unittest.TestCase):
         mock_find_license.assert_called_once_with(repo_path)
         mock_confirm_license.assert_called_once_with("MIT License", force_confirmation=True)
         
+    def _archive_args(self, **overrides):
+        args = Namespace(
+            source_url="https://example.com/pkg.zip",
+            source_type="archive",
+            cache_dir=self.cache_dir,
+            verify_license=True,
+            dry_run=False,
+            verify_checksum=None,
+            max_download_size=100,
+            timeout=60,
+            scan_archives=False
+        )
+        for key, value in overrides.items():
+            setattr(args, key, value)
+        return args
+
+    def _zip_response(self):
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w") as zipf:
+            zipf.writestr("pkg/LICENSE", "MIT License")
+        return self._response([data.getvalue()])
+
+    @patch('requests.get')
+    @patch('secret_hunter.fetcher._extract_archive')
+    @patch('secret_hunter.fetcher.confirm_license')
+    def test_fetch_source_scan_archives_skips_extraction(self, mock_confirm_license, mock_extract_archive, mock_get):
+        mock_get.return_value = self._zip_response()
+
+        target_path = fetch_source(self._archive_args(scan_archives=True))
+
+        self.assertEqual(os.path.basename(target_path), "pkg.zip")
+        self.assertTrue(zipfile.is_zipfile(target_path))
+        mock_extract_archive.assert_not_called()
+        mock_confirm_license.assert_called_once_with("MIT License", force_confirmation=True)
+
+    @patch('requests.get')
+    @patch('secret_hunter.fetcher.confirm_license')
+    def test_fetch_source_reuses_cached_extraction(self, mock_confirm_license, mock_get):
+        mock_get.return_value = self._zip_response()
+
+        first_path = fetch_source(self._archive_args())
+        with patch('secret_hunter.fetcher._extract_archive') as mock_extract_archive:
+            second_path = fetch_source(self._archive_args())
+
+        self.assertEqual(first_path, second_path)
+        self.assertEqual(mock_get.call_count, 1)
+        mock_extract_archive.assert_not_called()
+        self.assertEqual(_find_license(os.path.join(second_path, "pkg")), "MIT License")
+
     @patch('secret_hunter.fetcher._fetch_git')
     def test_fetch_source_dry_run(self, mock_fetch_git):
         args = Namespace(
@@ -117,5 +277,75 @@ class TestFetcher(unittest.TestCase):
         mock_fetch_git.assert_not_called()
 
 
+class TestFetchGitModes(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.test_dir, ".cache")
+        self.work = git.Repo.init(os.path.join(self.test_dir, "work"), initial_branch="main")
+        with self.work.config_writer() as config:
+            config.set_value("user", "name", "Test")
+            config.set_value("user", "email", "test@example.com")
+        self._commit({"README": "readme v1\n", "src/app.py": "v1\n", "docs/guide.md": "guide\n"})
+        self.work.create_tag("v1")
+        self._commit({"src/app.py": "v2\n"})
+        bare_path = os.path.join(self.test_dir, "remote.git")
+        self.work.git.clone("--bare", self.work.working_dir, bare_path)
+        git.Repo(bare_path).git.config("uploadpack.allowFilter", "true")
+        self.work.create_remote("origin", bare_path)
+        self.url = "file://" + bare_path
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _commit(self, files):
+        for name, text in files.items():
+            path = os.path.join(self.work.working_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text)
+        self.work.index.add(list(files))
+        self.work.index.commit(f"Update {', '.join(files)}")
+
+    def _fetch(self, **kwargs):
+        with patch("builtins.print"):
+            return git.Repo(_fetch_git(self.url, cache_dir=self.cache_dir, **kwargs))
+
+    def _read(self, repo, name):
+        with open(os.path.join(repo.working_dir, name)) as f:
+            return f.read()
+
+    def test_shallow_clone_of_a_tag(self):
+        repo = self._fetch(branch=None, tag="v1", depth=1)
+        self.assertEqual(self._read(repo, "src/app.py"), "v1\n")
+        self.assertEqual(repo.git.rev_list("--count", "HEAD"), "1")
+
+    def test_blobless_sparse_clone(self):
+        repo = self._fetch(branch="main", tag=None, blobless=True, sparse_paths=["src"])
+        self.assertEqual(self._read(repo, "src/app.py"), "v2\n")
+        self.assertTrue(os.path.exists(os.path.join(repo.working_dir, "README")))
+        self.assertFalse(os.path.exists(os.path.join(repo.working_dir, "docs")))
+        self.assertEqual(repo.git.config("remote.origin.partialclonefilter"), "blob:none")
+        # Blobs outside the checkout are not downloaded, but are fetched on demand when read.
+        missing = repo.git.rev_list("--objects", "--all", "--missing=print").splitlines()
+        self.assertIn("?" + self.work.commit("HEAD").tree["docs/guide.md"].hexsha, missing)
+        self.assertEqual(repo.git.show("HEAD:docs/guide.md"), "guide")
+
+    def test_cached_clone_fetches_only_the_ref(self):
+        self._fetch(branch="main", tag=None, depth=1, sparse_paths=["src"])
+        self._commit({"src/app.py": "v3\n", "docs/guide.md": "guide v2\n"})
+        self.work.git.push("origin", "main")
+
+        repo = self._fetch(branch="main", tag=None, depth=1, sparse_paths=["src"])
+        self.assertEqual(self._read(repo, "src/app.py"), "v3\n")
+        self.assertEqual(repo.active_branch.name, "main")
+        self.assertEqual(repo.git.rev_list("--count", "HEAD"), "1")
+        self.assertFalse(os.path.exists(os.path.join(repo.working_dir, "docs")))
+
+        repo = self._fetch(branch=None, tag="v1", depth=1)
+        self.assertEqual(self._read(repo, "src/app.py"), "v1\n")
+        self.assertEqual(self._read(repo, "docs/guide.md"), "guide\n")
+
+
 if __name__ == '__main__':
     unittest.main()
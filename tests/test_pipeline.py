@@ -0,0 +1,139 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+import yaml
+from argparse import Namespace
+from secret_hunter.pipeline import read_manifest, run_batch
+from secret_hunter.remediation import generate_report
+from secret_hunter.stats import ScanStats
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.rules_file = os.path.join(self.test_dir, "rules.yml")
+        with open(self.rules_file, "w") as f:
+            yaml.dump({"rules": [{"id": "test-key", "regex": "TEST_KEY", "type": "Test Key", "confidence": "High"}]}, f)
+
+        self.targets = {}
+        for name in ("alpha", "beta"):
+            target = os.path.join(self.test_dir, name)
+            os.makedirs(target)
+            with open(os.path.join(target, "config.txt"), "w") as f:
+                f.write(f"{name} = TEST_KEY\n")
+            self.targets[f"https://example.com/{name}.zip"] = target
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _args(self, **overrides):
+        args = Namespace(
+            cache_dir=os.path.join(self.test_dir, ".cache"),
+            rules=self.rules_file,
+            whitelist=None,
+            no_decompile=False,
+            max_depth=10,
+            jobs=2,
+            max_connections=2,
+            verify_license=True,
+            verify_checksum=None,
+            scan_archives=False,
+            archive_depth=0,
+        )
+        for key, value in overrides.items():
+            setattr(args, key, value)
+        return args
+
+    def test_read_manifest(self):
+        manifest = os.path.join(self.test_dir, "manifest.txt")
+        with open(manifest, "w") as f:
+            f.write("# nightly audit\n\nhttps://example.com/a.zip abc123\nhttps://github.com/example/b.git\n")
+
+        self.assertEqual(read_manifest(manifest), [
+            ("https://example.com/a.zip", "abc123"),
+            ("https://github.com/example/b.git", None),
+        ])
+
+    @patch('secret_hunter.pipeline.confirm_license')
+    @patch('secret_hunter.pipeline.resolve_source')
+    def test_run_batch_combines_findings(self, mock_resolve_source, mock_confirm_license):
+        mock_resolve_source.side_effect = lambda url, args, session, evict: (self.targets[url], "MIT License")
+        targets = [(url, "abc123") for url in sorted(self.targets)]
+
+        findings = list(run_batch(self._args(), targets))
+
+        self.assertEqual(sorted(finding["source"] for finding in findings), sorted(self.targets))
+        self.assertEqual(mock_confirm_license.call_count, 2)
+        for call in mock_resolve_source.call_args_list:
+            url, target_args, session, evict = call[0]
+            self.assertEqual(target_args.source_url, url)
+            self.assertFalse(evict)
+            self.assertEqual(target_args.verify_checksum, "abc123")
+            self.assertIsNotNone(session)
+
+    @patch('secret_hunter.pipeline.confirm_license')
+    @patch('secret_hunter.pipeline.resolve_source')
+    def test_run_batch_fetches_duplicate_urls_once(self, mock_resolve_source, mock_confirm_license):
+        mock_resolve_source.side_effect = lambda url, args, session, evict: (self.targets[url], None)
+        targets = [(url, None) for url in sorted(self.targets)] * 2
+
+        with patch("builtins.print"):
+            findings = list(run_batch(self._args(), targets))
+
+        self.assertEqual(sorted(finding["source"] for finding in findings), sorted(self.targets))
+        self.assertEqual(sorted(call[0][0] for call in mock_resolve_source.call_args_list), sorted(self.targets))
+
+    @patch('secret_hunter.pipeline.confirm_license')
+    @patch('secret_hunter.pipeline.resolve_source')
+    def test_run_batch_skips_failed_targets(self, mock_resolve_source, mock_confirm_license):
+        def resolve(url, args, session, evict):
+            if "alpha" in url:
+                raise ValueError("Checksum verification failed.")
+            return self.targets[url], None
+        mock_resolve_source.side_effect = resolve
+
+        findings = list(run_batch(self._args(), [(url, None) for url in sorted(self.targets)]))
+
+        self.assertEqual([finding["source"] for finding in findings], ["https://example.com/beta.zip"])
+        mock_confirm_license.assert_called_once_with(None, force_confirmation=True)
+
+    @patch('secret_hunter.pipeline.confirm_license')
+    @patch('secret_hunter.pipeline.resolve_source')
+    def test_run_batch_applies_scan_options(self, mock_resolve_source, mock_confirm_license):
+        mock_resolve_source.side_effect = lambda url, args, session, evict: (self.targets[url], None)
+        targets = [(url, None) for url in sorted(self.targets)]
+        baseline = os.path.join(self.test_dir, "baseline.json")
+        with patch("builtins.print"):
+            findings = list(run_batch(self._args(), targets))
+            generate_report([finding for finding in findings if "alpha" in finding["source"]], baseline)
+
+        stats = ScanStats()
+        findings = list(run_batch(self._args(baseline=baseline, new_only=True, incremental=True, type="file"),
+                                  targets, stats))
+
+        self.assertEqual([finding["source"] for finding in findings], ["https://example.com/beta.zip"])
+        self.assertEqual(stats.files_scanned, 2)
+        self.assertEqual(stats.findings_suppressed, 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.test_dir, ".cache", "scan-cache"))), 2)
+
+    @patch('secret_hunter.pipeline.ArtifactCache')
+    @patch('secret_hunter.pipeline.confirm_license')
+    @patch('secret_hunter.pipeline.resolve_source')
+    def test_run_batch_evicts_after_scans_and_reports_missing_targets(self, mock_resolve_source, mock_confirm_license,
+                                                                      mock_cache):
+        shutil.rmtree(self.targets["https://example.com/alpha.zip"])
+        mock_resolve_source.side_effect = lambda url, args, session, evict: (self.targets[url], None)
+
+        with patch("builtins.print") as mock_print:
+            findings = list(run_batch(self._args(), [(url, None) for url in sorted(self.targets)]))
+
+        self.assertEqual([finding["source"] for finding in findings], ["https://example.com/beta.zip"])
+        self.assertTrue(mock_print.call_args[0][0].startswith("Error scanning https://example.com/alpha.zip"))
+        mock_cache.return_value.evict.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from secret_hunter.remediation import generate_report, merge_reports, read_report
+from secret_hunter.findings import Finding, rule_info
+from secret_hunter.stats import ScanStats
+
+class TestRemediation(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.test_dir, "report")
+        self.findings = [
+            {"id": "aws-access-key", "file": "a.py", "line": 3, "snippet": "key = AKIA...", "type": "AWS Access Key", "confidence": "High"},
+            {"id": "generic-api-key", "file": "b.py", "line": 1, "snippet": "api_key=...", "type": "Generic API Key", "confidence": "Medium", "commit": "abc123"},
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _read(self):
+        with open(self.output) as f:
+            return f.read()
+
+    def test_json_report_matches_json_dump(self):
+        for findings in ([], self.findings):
+            count = generate_report(iter(findings), self.output)
+            self.assertEqual(count, len(findings))
+            self.assertEqual(self._read(), json.dumps({"findings": findings}, indent=2))
+
+    def test_reports_include_stats(self):
+        stats = ScanStats()
+        stats.record_file(100)
+        stats.add_rule("aws-access-key", 0.5, True)
+
+        generate_report(iter(self.findings), self.output, "json", stats)
+        self.assertEqual(self._read(), json.dumps({"findings": self.findings, "stats": stats.to_dict()}, indent=2))
+
+        generate_report(iter(self.findings), self.output, "jsonl", stats)
+        self.assertEqual(json.loads(self._read().splitlines()[-1]), {"stats": stats.to_dict()})
+
+        generate_report(iter(self.findings), self.output, "sarif", stats)
+        sarif = json.loads(self._read())
+        self.assertEqual(sarif["runs"][0]["properties"]["stats"]["files_scanned"], 1)
+
+    def test_jsonl_report(self):
+        generate_report(iter(self.findings), self.output, "jsonl")
+        self.assertEqual([json.loads(line) for line in self._read().splitlines()], self.findings)
+
+    def test_sarif_report(self):
+        generate_report(iter(self.findings), self.output, "sarif")
+        sarif = json.loads(self._read())
+        self.assertEqual(sarif["version"], "2.1.0")
+        results = sarif["runs"][0]["results"]
+        self.assertEqual([result["ruleId"] for result in results], ["aws-access-key", "generic-api-key"])
+        self.assertEqual(results[0]["level"], "error")
+        self.assertEqual(results[1]["locations"][0]["physicalLocation"]["region"]["startLine"], 1)
+        self.assertEqual(results[1]["properties"]["commit"], "abc123")
+
+        generate_report(iter([]), self.output, "sarif")
+        self.assertEqual(json.loads(self._read())["runs"][0]["results"], [])
+
+    def _repeated_secret(self):
+        rule = rule_info("aws-access-key", "AWS Access Key", "High")
+        return [Finding(rule, path, line, "key = AKIA...", 7, 27, "0123456789abcdef")
+                for path, line in [("a.py", 1), ("a.py", 9), ("b.py", 2)]] + [
+            Finding(rule, "c.py", 1, "key = AKIA...", 7, 27, "fedcba9876543210")]
+
+    def test_json_report_groups_repeated_secrets(self):
+        findings = self._repeated_secret()
+        generate_report(iter(findings), self.output)
+        self.assertEqual(self._read(), json.dumps({
+            "findings": [dict(finding) for finding in findings],
+            "secrets": [{"secret_hash": "0123456789abcdef", "id": "aws-access-key", "count": 3, "files": 2}],
+        }, indent=2))
+
+    def test_json_report_counts_files_of_unordered_findings(self):
+        findings = self._repeated_secret()
+        findings = [findings[0], findings[2], findings[1]]
+        generate_report(iter(findings), self.output)
+        self.assertEqual(json.loads(self._read())["secrets"],
+                         [{"secret_hash": "0123456789abcdef", "id": "aws-access-key", "count": 3, "files": 2}])
+
+    def test_sarif_report_fingerprints_secrets(self):
+        generate_report(iter(self._repeated_secret()), self.output, "sarif")
+        result = json.loads(self._read())["runs"][0]["results"][0]
+        self.assertEqual(result["partialFingerprints"], {"secretHash/v1": "0123456789abcdef"})
+        region = result["locations"][0]["physicalLocation"]["region"]
+        self.assertEqual((region["startColumn"], region["endColumn"]), (7, 27))
+        self.assertEqual(result["properties"], {"type": "AWS Access Key", "confidence": "High"})
+
+    def test_every_format_reads_back(self):
+        findings = [dict(finding) for finding in self._repeated_secret()] + self.findings[1:]
+        stats = ScanStats()
+        stats.record_file(100)
+        for report_format in ("json", "jsonl", "sarif"):
+            generate_report(iter(findings), self.output, report_format, stats)
+            self.assertEqual(read_report(self.output), (findings, stats.to_dict()))
+
+    def test_merge_reports(self):
+        parts = []
+        for index, (part_findings, files) in enumerate([(self.findings[1:] + self.findings[:1], 2), (self.findings[:1], 1)]):
+            stats = ScanStats()
+            for _ in range(files):
+                stats.record_file(100)
+            stats.wall_seconds = 1.0 + index
+            parts.append(os.path.join(self.test_dir, f"part{index}.json"))
+            generate_report(iter(part_findings), parts[-1], "jsonl" if index else "json", stats)
+
+        findings, stats = merge_reports(parts)
+        self.assertEqual(findings, self.findings)
+        self.assertEqual((stats.files_scanned, stats.bytes_read, stats.wall_seconds), (3, 300, 2.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+from secret_hunter.rule_analysis import RegexAnalysis, check_rules, required_literal
+
+
+class TestRegexAnalysis(unittest.TestCase):
+
+    def test_required_literal(self):
+        self.assertEqual(required_literal("AKIA[0-9A-Z]{16}"), "AKIA")
+        self.assertEqual(required_literal("[Aa]pi_secret\\s*=\\s*\\w+"), "pi_secret")
+        self.assertEqual(required_literal("x(?:-----BEGIN)+ KEY"), "-----BEGIN")
+        self.assertEqual(required_literal("(?:abc)?de"), "")
+        self.assertEqual(required_literal("abcd|efgh"), "")
+        self.assertEqual(required_literal("(?i)password"), "")
+        self.assertEqual(required_literal("key(?i:word)=secret"), "=secret")
+
+    def test_nested_quantifiers(self):
+        for regex in ["(a+)+b", "(a*)*", "(?:\\w+\\s?)+$", "x(?:(?:ab|c)+)*"]:
+            self.assertTrue(RegexAnalysis(regex).nested_quantifier, regex)
+        for regex in ["AKIA[0-9A-Z]{16}", "(?:\\w+\\.)+com", "(\\d{1,3}\\.){3}\\d+", "(ab)+"]:
+            self.assertFalse(RegexAnalysis(regex).nested_quantifier, regex)
+
+    def test_overlapping_alternatives_under_a_repeat(self):
+        for regex in ["(?:a|aa)+$", "(a|a)*b", "(?:ab|a)+c", "(?i)(?:key|KEY)+="]:
+            self.assertTrue(RegexAnalysis(regex).nested_quantifier, regex)
+        for regex in ["(?:key|token)+=", "(?:https?|ftp)://\\S+", "(?:[a-z]+\\.|\\d)+x", "(?:a|aa)b"]:
+            self.assertFalse(RegexAnalysis(regex).nested_quantifier, regex)
+
+    def test_cost_grows_with_nested_repeats(self):
+        self.assertEqual(RegexAnalysis("AKIA[0-9A-Z]{16}").cost, 20)
+        self.assertFalse(RegexAnalysis("[Aa][Pp][Ii]_?[Kk][Ee][Yy]\\s*[:=]\\s*[0-9a-z]{32,45}").expensive)
+        self.assertTrue(RegexAnalysis("(?:\\w{1,40}=){1,40}").expensive)
+
+
+class TestCheckRules(unittest.TestCase):
+
+    @patch("builtins.print")
+    def test_invalid_and_unsafe_rules_are_dropped(self, mock_print):
+        rules = [
+            {"id": "ok", "regex": "AKIA[0-9A-Z]{16}", "type": "T", "confidence": "High"},
+            {"id": "broken", "regex": "AKIA[", "type": "T", "confidence": "High"},
+            {"id": "redos", "regex": "(a+)+b", "type": "T", "confidence": "High"},
+            {"id": "redos-alternation", "regex": "(?:a|aa)+$", "type": "T", "confidence": "High"},
+            {"id": "ok", "regex": "AIza\\w{35}", "type": "T", "confidence": "High"},
+            {"id": "no-type", "regex": "x", "confidence": "High"},
+            {"id": "bad-entropy", "entropy": {"threshold": "high"}, "type": "T", "confidence": "Low"},
+            {"id": "slow", "regex": "(?:\\w{1,40}=){1,40}", "type": "T", "confidence": "Low"},
+        ]
+        self.assertEqual([rule["id"] for rule in check_rules(rules)], ["ok", "slow"])
+        messages = [call.args[0] for call in mock_print.call_args_list]
+        self.assertEqual(sum(message.startswith("Error") for message in messages), 6)
+        self.assertTrue(any("redos" in message and "nested" in message for message in messages))
+        self.assertTrue(any("redos-alternation" in message for message in messages))
+        self.assertTrue(messages[-1].startswith("Warning: rule slow"))
+
+    def test_default_rules_are_valid(self):
+        from secret_hunter.rules import load_rules
+        with patch("builtins.print") as mock_print:
+            self.assertEqual(len(load_rules("rules.yml")), 6)
+        mock_print.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import os
+import shutil
+import tempfile
+from secret_hunter.triage import (ExcludeMatcher, build_excludes, classify, in_shard, parse_shard, shard_key,
+                                  subdirectory_exclude, walk_files)
+
+
+class TestExcludeMatcher(unittest.TestCase):
+
+    def test_unanchored_pattern_matches_at_any_depth(self):
+        matcher = ExcludeMatcher(["*.min.js", "build/"])
+        self.assertTrue(matcher.match("app.min.js"))
+        self.assertTrue(matcher.match("static/js/app.min.js"))
+        self.assertFalse(matcher.match("static/js/app.js"))
+        self.assertTrue(matcher.match("src/build", is_dir=True))
+        self.assertFalse(matcher.match("src/build"))
+
+    def test_anchored_pattern(self):
+        matcher = ExcludeMatcher(["/docs", "assets/**/*.bin", "# comment", ""])
+        self.assertTrue(matcher.match("docs", is_dir=True))
+        self.assertFalse(matcher.match("src/docs", is_dir=True))
+        self.assertTrue(matcher.match("assets/blob.bin"))
+        self.assertTrue(matcher.match("assets/a/b/blob.bin"))
+        self.assertFalse(matcher.match("other/assets/blob.bin"))
+
+    def test_build_excludes(self):
+        self.assertIn("node_modules/", build_excludes())
+        self.assertEqual(build_excludes(["*.log"], default_excludes=False), ["*.log"])
+
+
+class TestClassify(unittest.TestCase):
+
+    def test_classify(self):
+        self.assertEqual(classify(b"\x89PNG\r\n\x1a\n\x00\x00"), "media")
+        self.assertEqual(classify(b"\x00\x00\x00\x18ftypmp42"), "media")
+        self.assertEqual(classify(b"\x7fELF\x02\x01\x01\x00"), "binary")
+        self.assertEqual(classify(b"password = hunter2\n"), "text")
+
+
+class TestShards(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_every_key_is_in_exactly_one_shard(self):
+        keys = [f"src/module{i}.py" for i in range(200)]
+        shards = [[key for key in keys if in_shard(key, (index, 4))] for index in range(1, 5)]
+        self.assertEqual(sorted(sum(shards, [])), sorted(keys))
+        self.assertTrue(all(shards))
+        # Stable across processes and hosts, unlike hash().
+        self.assertTrue(in_shard("src/module0.py", (3, 4)))
+
+    def test_shard_key_is_relative_to_the_target(self):
+        target = tempfile.mkdtemp()
+        try:
+            self.assertEqual(shard_key(os.path.join(target, "src", "a.py"), target), "src/a.py")
+            self.assertEqual(shard_key(os.path.join(target, "a.py"), os.path.join(target, "a.py")), "a.py")
+        finally:
+            shutil.rmtree(target)
+
+
+class TestWalkFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for relpath, size in [
+            ("config.py", 10),
+            ("logo.png", 10),
+            ("big.log", 5000),
+            ("package-lock.json", 10),
+            ("node_modules/lib/index.js", 10),
+            (".git/objects/ab/cdef", 10),
+            ("a/b/c/deep.txt", 10),
+            (".cache/rules/0123.json", 10),
+            ("a/.cache/notes.txt", 10),
+        ]:
+            path = os.path.join(self.test_dir, relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"x" * size)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _walk(self, **kwargs):
+        return sorted(os.path.relpath(path, self.test_dir).replace(os.sep, "/")
+                      for path, _ in walk_files(self.test_dir, **kwargs))
+
+    def test_default_excludes_and_media(self):
+        self.assertEqual(self._walk(), [".cache/rules/0123.json", "a/.cache/notes.txt", "a/b/c/deep.txt", "big.log",
+                                        "config.py"])
+
+    def test_max_depth_and_size(self):
+        self.assertEqual(self._walk(max_depth=2, max_file_size=1000),
+                         [".cache/rules/0123.json", "a/.cache/notes.txt", "config.py"])
+        self.assertEqual(self._walk(max_depth=3, max_file_size=1000),
+                         [".cache/rules/0123.json", "a/.cache/notes.txt", "a/b/c/deep.txt", "config.py"])
+
+    def test_cache_dir_inside_the_target_is_excluded(self):
+        cache_dir = os.path.join(self.test_dir, ".cache")
+        excludes = build_excludes() + [subdirectory_exclude(self.test_dir, cache_dir)]
+        self.assertEqual(self._walk(excludes=excludes), ["a/.cache/notes.txt", "a/b/c/deep.txt", "big.log", "config.py"])
+        pattern = subdirectory_exclude(os.path.join(self.test_dir, "a"), os.path.join(self.test_dir, "a", "b[1]"))
+        self.assertEqual(pattern, "/b[[]1[]]/")
+        self.assertTrue(ExcludeMatcher([pattern]).match("b[1]", is_dir=True))
+        self.assertFalse(ExcludeMatcher([pattern]).match("b1", is_dir=True))
+        self.assertIsNone(subdirectory_exclude(os.path.join(self.test_dir, "a"), cache_dir))
+        self.assertIsNone(subdirectory_exclude(self.test_dir, self.test_dir))
+        self.assertIsNone(subdirectory_exclude(os.path.join(self.test_dir, "config.py"), cache_dir))
+
+    def test_no_excludes(self):
+        self.assertIn("node_modules/lib/index.js", self._walk(excludes=()))
+
+
+if __name__ == '__main__':
+    unittest.main()